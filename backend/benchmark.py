@@ -0,0 +1,291 @@
+"""Load test and latency benchmark for the /api/todos endpoints.
+
+Runs in-process against main.app (TODO_STORAGE=memory by default, or
+sqlite / dynamodb with DYNAMODB_ENDPOINT_URL pointing at DynamoDB Local)
+or against a running server with --url. Prints a JSON report with
+p50/p95/p99 latency, throughput and error rate per endpoint.
+
+    uv run --extra bench python benchmark.py --mix read-heavy --out base.json
+    uv run --extra bench python benchmark.py --baseline base.json
+
+With --baseline, the run exits non-zero when any endpoint's --gate-metric
+regressed by more than --max-regression, or its error rate exceeds
+--max-error-rate.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+
+# Operation weights per mix. `since` reads the change feed from the start of
+# the run; `delete` removes a todo created earlier (or creates one if none
+# are left).
+MIXES = {
+    "read-heavy": {"list": 80, "since": 10, "create": 8, "delete": 2},
+    "write-heavy": {"list": 20, "since": 5, "create": 60, "delete": 15},
+    "delete-churn": {"list": 10, "since": 10, "create": 40, "delete": 40},
+}
+
+ENDPOINTS = {
+    "list": "GET /api/todos",
+    "since": "GET /api/todos?since",
+    "create": "POST /api/todos",
+    "delete": "DELETE /api/todos/{id}",
+}
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted `samples`."""
+    if not samples:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(samples)))
+    return samples[min(rank, len(samples)) - 1]
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = {name: [] for name in ENDPOINTS}
+        self.errors: dict[str, int] = dict.fromkeys(ENDPOINTS, 0)
+
+    def add(self, op: str, seconds: float, ok: bool) -> None:
+        self.latencies[op].append(seconds * 1000)
+        if not ok:
+            self.errors[op] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for op, samples in self.latencies.items():
+            if not samples:
+                continue
+            samples = sorted(samples)
+            endpoints[ENDPOINTS[op]] = {
+                "requests": len(samples),
+                "errors": self.errors[op],
+                "error_rate": round(self.errors[op] / len(samples), 4),
+                "throughput_rps": round(len(samples) / elapsed, 1),
+                "mean_ms": round(sum(samples) / len(samples), 3),
+                "p50_ms": round(percentile(samples, 50), 3),
+                "p95_ms": round(percentile(samples, 95), 3),
+                "p99_ms": round(percentile(samples, 99), 3),
+                "max_ms": round(samples[-1], 3),
+            }
+        total = sum(len(s) for s in self.latencies.values())
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+            "errors": sum(self.errors.values()),
+            "endpoints": endpoints,
+        }
+
+
+class Workload:
+    """Shared state for the workers: ids that can be deleted and the
+    version to read the change feed from."""
+
+    def __init__(self, client, mix: dict[str, int], rng: random.Random) -> None:
+        self._client = client
+        self._ops = list(mix)
+        self._weights = list(mix.values())
+        self._rng = rng
+        self.live_ids: list[int] = []
+        self.since = 0
+
+    def pick(self) -> str:
+        return self._rng.choices(self._ops, self._weights)[0]
+
+    async def seed(self, count: int) -> None:
+        """Create `count` todos up front via the batch endpoint."""
+        for start in range(0, count, 1000):
+            size = min(1000, count - start)
+            response = await self._client.post(
+                "/api/todos:batch",
+                json={"items": [{"title": f"seed {start + i}"} for i in range(size)]},
+            )
+            response.raise_for_status()
+            self.live_ids.extend(r["id"] for r in response.json()["results"])
+        head = await self._client.post("/api/todos", json={"title": "since marker"})
+        head.raise_for_status()
+        self.live_ids.append(head.json()["id"])
+        self.since = head.json()["version"]
+
+    async def run(self, op: str) -> bool:
+        if op == "delete" and not self.live_ids:
+            op = "create"
+        if op == "list":
+            response = await self._client.get("/api/todos", params={"limit": 100})
+        elif op == "since":
+            response = await self._client.get(
+                "/api/todos", params={"since": self.since, "limit": 100}
+            )
+        elif op == "create":
+            response = await self._client.post(
+                "/api/todos", json={"title": f"bench {self._rng.random():.6f}"}
+            )
+            if response.status_code == 201:
+                self.live_ids.append(response.json()["id"])
+        else:
+            ids = self.live_ids
+            index = self._rng.randrange(len(ids))
+            ids[index], ids[-1] = ids[-1], ids[index]
+            response = await self._client.delete(f"/api/todos/{ids.pop()}")
+        return response.status_code < 400
+
+
+async def _worker(workload: Workload, recorder: Recorder | None, budget) -> None:
+    while budget():
+        op = workload.pick()
+        started = time.perf_counter()
+        try:
+            ok = await workload.run(op)
+        except Exception:
+            ok = False
+        if recorder is not None:
+            recorder.add(op, time.perf_counter() - started, ok)
+
+
+def _request_budget(total: int):
+    remaining = [total]
+
+    def take() -> bool:
+        remaining[0] -= 1
+        return remaining[0] >= 0
+
+    return take
+
+
+def _time_budget(seconds: float):
+    deadline = time.perf_counter() + seconds
+
+    def take() -> bool:
+        return time.perf_counter() < deadline
+
+    return take
+
+
+def _make_client(args):
+    import httpx
+
+    if args.url:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        return httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30)
+    os.environ.setdefault("TODO_STORAGE", "memory")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import main
+
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=main.app), base_url="http://bench"
+    )
+
+
+async def run_benchmark(args) -> dict:
+    rng = random.Random(args.seed)
+    async with _make_client(args) as client:
+        workload = Workload(client, MIXES[args.mix], rng)
+        await workload.seed(args.seed_todos)
+        warmup = _request_budget(args.warmup)
+        await asyncio.gather(
+            *(_worker(workload, None, warmup) for _ in range(args.concurrency))
+        )
+        recorder = Recorder()
+        budget = (
+            _time_budget(args.duration)
+            if args.duration
+            else _request_budget(args.requests)
+        )
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(_worker(workload, recorder, budget) for _ in range(args.concurrency))
+        )
+        elapsed = time.perf_counter() - started
+    return {
+        "config": {
+            "mix": args.mix,
+            "concurrency": args.concurrency,
+            "requests": None if args.duration else args.requests,
+            "duration_s": args.duration,
+            "seed_todos": args.seed_todos,
+            "target": args.url or f"in-process ({os.environ['TODO_STORAGE']})",
+        },
+        **recorder.summary(elapsed),
+    }
+
+
+def check_regressions(
+    report: dict,
+    baseline: dict,
+    metric: str,
+    max_regression: float,
+    max_error_rate: float,
+) -> list[str]:
+    """Return one message per endpoint that fails the gate."""
+    failures = []
+    for endpoint, stats in report["endpoints"].items():
+        if stats["error_rate"] > max_error_rate:
+            failures.append(
+                f"{endpoint}: error rate {stats['error_rate']:.2%} "
+                f"> {max_error_rate:.2%}"
+            )
+        base = baseline["endpoints"].get(endpoint)
+        if not base or not base[metric]:
+            continue
+        change = stats[metric] / base[metric] - 1
+        if change > max_regression:
+            failures.append(
+                f"{endpoint}: {metric} {base[metric]} -> {stats[metric]} "
+                f"(+{change:.0%}, limit +{max_regression:.0%})"
+            )
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mix", choices=MIXES, default="read-heavy")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument(
+        "--duration", type=float, help="run for N seconds instead of --requests"
+    )
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--seed-todos", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--url", help="benchmark a running server instead")
+    parser.add_argument("--out", help="also write the JSON report here")
+    parser.add_argument("--baseline", help="report to compare against")
+    parser.add_argument(
+        "--gate-metric", choices=["p50_ms", "p95_ms", "p99_ms"], default="p95_ms"
+    )
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument("--max-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    # Keep stdout for the report (the app logs its cold-start line there).
+    with contextlib.redirect_stdout(sys.stderr):
+        report = asyncio.run(run_benchmark(args))
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["regressions"] = check_regressions(
+            report,
+            baseline,
+            args.gate_metric,
+            args.max_regression,
+            args.max_error_rate,
+        )
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    for failure in report.get("regressions", []):
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,420 @@
+"""DynamoDB implementation of TodoRepository (the production backend)."""
+
+import asyncio
+import functools
+import os
+import random
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack
+
+from fastapi.concurrency import run_in_threadpool
+
+import tracing
+from parallel_scan import aparallel_scan
+
+# --- DynamoDB setup ---
+TABLE_NAME = os.getenv("DYNAMODB_TABLE", "sample-agentitest-todos")
+REGION = os.getenv("AWS_REGION_NAME", "ap-northeast-1")
+ENDPOINT_URL = os.getenv("DYNAMODB_ENDPOINT_URL") or None
+
+# Every live todo carries LIST_PARTITION in its `list_pk` attribute so the
+# `by_id` GSI (list_pk + id) returns rows in id order. The counter item has
+# no `list_pk`, which keeps it out of the (sparse) index.
+#
+# Both GSIs put every row in one partition (a constant key), so list and feed
+# reads and all index writes share that partition's throughput (roughly 3,000
+# reads / 1,000 writes per second). That is fine for this app; sharding the
+# key would trade the single ordered Query for a merge across shards.
+LIST_INDEX = os.getenv("DYNAMODB_LIST_INDEX", "by_id")
+LIST_PARTITION = "todo"
+
+# Every row also carries FEED_PARTITION in `feed_pk`, so the `by_version` GSI
+# is a change feed. Tombstones drop `list_pk` and DynamoDB TTL removes them
+# via `expires_at`.
+FEED_INDEX = os.getenv("DYNAMODB_FEED_INDEX", "by_version")
+FEED_PARTITION = "todo"
+
+# BatchWriteItem / BatchGetItem per-call limits and retry policy.
+BATCH_WRITE_SIZE = 25
+BATCH_GET_SIZE = 100
+BATCH_MAX_ATTEMPTS = 6
+BATCH_BACKOFF_BASE = 0.05
+
+# Parallel Scan segments for full-table reads (export, migrate).
+SCAN_SEGMENTS = int(os.getenv("DYNAMODB_SCAN_SEGMENTS", "4"))
+
+# "sync" (boto3, for Mangum/Lambda) or "async" (aiobotocore, for uvicorn).
+CLIENT_MODE = os.getenv("TODO_DYNAMODB_CLIENT", "sync")
+MAX_POOL_CONNECTIONS = int(os.getenv("DYNAMODB_MAX_POOL_CONNECTIONS", "10"))
+
+
+def _prepare_trace(kwargs: dict) -> "tracing.Trace | None":
+    """Ask for consumed capacity when the current request is traced."""
+    trace = tracing.current()
+    if trace is not None:
+        kwargs["ReturnConsumedCapacity"] = "TOTAL"
+    return trace
+
+
+class SyncDynamoClient:
+    """boto3 client whose blocking calls run in the threadpool.
+
+    Lambda serves one request per container, so this is the cheapest
+    option there; under uvicorn every in-flight call holds a worker thread.
+    """
+
+    def __init__(self) -> None:
+        import boto3
+        from botocore.config import Config
+
+        self._client = boto3.client(
+            "dynamodb",
+            region_name=REGION,
+            endpoint_url=ENDPOINT_URL,
+            config=Config(max_pool_connections=MAX_POOL_CONNECTIONS, tcp_keepalive=True),
+        )
+
+    async def call(self, operation: str, **kwargs) -> dict:
+        trace = _prepare_trace(kwargs)
+        response = {}
+        try:
+            response = await run_in_threadpool(
+                getattr(self._client, operation), **kwargs
+            )
+            return response
+        finally:
+            if trace is not None:
+                trace.record_call(response.get("ConsumedCapacity"))
+
+    async def close(self) -> None:
+        self._client.close()
+
+
+class AsyncDynamoClient:
+    """aiobotocore client sharing one keep-alive connection pool.
+
+    Requires the `async` extra. The underlying aiohttp session is bound to
+    the event loop that opens it, so use this under uvicorn, not Mangum.
+    """
+
+    def __init__(self) -> None:
+        from aiobotocore.config import AioConfig
+        from aiobotocore.session import get_session
+
+        self._session = get_session()
+        self._config = AioConfig(
+            max_pool_connections=MAX_POOL_CONNECTIONS, tcp_keepalive=True
+        )
+        self._stack = AsyncExitStack()
+        self._client = None
+        self._open_lock = asyncio.Lock()
+
+    async def call(self, operation: str, **kwargs) -> dict:
+        if self._client is None:
+            async with self._open_lock:
+                if self._client is None:
+                    self._client = await self._stack.enter_async_context(
+                        self._session.create_client(
+                            "dynamodb",
+                            region_name=REGION,
+                            endpoint_url=ENDPOINT_URL,
+                            config=self._config,
+                        )
+                    )
+        trace = _prepare_trace(kwargs)
+        response = {}
+        try:
+            response = await getattr(self._client, operation)(**kwargs)
+            return response
+        finally:
+            if trace is not None:
+                trace.record_call(response.get("ConsumedCapacity"))
+
+    async def close(self) -> None:
+        await self._stack.aclose()
+        self._client = None
+
+
+def _is_condition_failure(exc: Exception) -> bool:
+    """True for a botocore ConditionalCheckFailedException (sync or async)."""
+    error = getattr(exc, "response", None) or {}
+    return error.get("Error", {}).get("Code") == "ConditionalCheckFailedException"
+
+
+def _to_attr(value) -> dict:
+    """Marshal an int, bool or str into a DynamoDB AttributeValue."""
+    if isinstance(value, bool):
+        return {"BOOL": value}
+    if isinstance(value, int):
+        return {"N": str(value)}
+    return {"S": value}
+
+
+def _from_attr(attr: dict):
+    """Unmarshal the AttributeValue types this table uses."""
+    if "N" in attr:
+        return int(attr["N"])
+    if "BOOL" in attr:
+        return attr["BOOL"]
+    return attr["S"]
+
+
+def _to_item(item: dict) -> dict:
+    return {k: _to_attr(v) for k, v in item.items()}
+
+
+def _from_item(item: dict) -> dict:
+    return {k: _from_attr(v) for k, v in item.items()}
+
+
+def _to_row(item: dict) -> dict:
+    """Strip index attributes from a stored item."""
+    row = {
+        "id": item["id"],
+        "title": item.get("title", ""),
+        "version": item.get("version", 0),
+        "deleted": item.get("deleted", False),
+    }
+    if "expires_at" in item:
+        row["expires_at"] = item["expires_at"]
+    return row
+
+
+def _to_stored(row: dict) -> dict:
+    """Add the index attributes a row needs to show up in list/feed GSIs."""
+    item = {**row, "feed_pk": FEED_PARTITION}
+    if row.get("deleted"):
+        item["deleted"] = True
+    else:
+        item.pop("deleted", None)
+        item["list_pk"] = LIST_PARTITION
+    return item
+
+
+async def _backoff(attempt: int) -> None:
+    """Sleep with capped exponential backoff and full jitter."""
+    await asyncio.sleep(random.uniform(0, min(1.0, BATCH_BACKOFF_BASE * 2**attempt)))
+
+
+class DynamoTodoRepository:
+    """Todos in one DynamoDB table with the `by_id` and `by_version` GSIs."""
+
+    def __init__(self) -> None:
+        if CLIENT_MODE == "async":
+            self._client = AsyncDynamoClient()
+        elif CLIENT_MODE == "sync":
+            self._client = SyncDynamoClient()
+        else:
+            raise ValueError(f"Unknown TODO_DYNAMODB_CLIENT: {CLIENT_MODE!r}")
+
+    async def reserve_ids(self, size: int) -> int:
+        response = await self._client.call(
+            "update_item",
+            TableName=TABLE_NAME,
+            Key=_to_item({"id": 0}),
+            UpdateExpression="ADD counter_value :inc",
+            ExpressionAttributeValues=_to_item({":inc": size}),
+            ReturnValues="UPDATED_NEW",
+        )
+        return _from_item(response["Attributes"])["counter_value"]
+
+    async def list_page(
+        self, limit: int, after_id: int | None
+    ) -> tuple[list[dict], int | None]:
+        kwargs = {
+            "TableName": TABLE_NAME,
+            "IndexName": LIST_INDEX,
+            "KeyConditionExpression": "list_pk = :pk",
+            "ExpressionAttributeValues": _to_item({":pk": LIST_PARTITION}),
+            "Limit": limit,
+        }
+        if after_id is not None:
+            kwargs["ExclusiveStartKey"] = _to_item(
+                {"list_pk": LIST_PARTITION, "id": after_id}
+            )
+        result = await self._client.call("query", **kwargs)
+        rows = [_to_row(_from_item(item)) for item in result.get("Items", [])]
+        last_key = result.get("LastEvaluatedKey")
+        return rows, _from_item(last_key)["id"] if last_key else None
+
+    async def changes(
+        self, since: int, limit: int, after: tuple[int, int] | None
+    ) -> tuple[list[dict], tuple[int, int] | None]:
+        kwargs = {
+            "TableName": TABLE_NAME,
+            "IndexName": FEED_INDEX,
+            "KeyConditionExpression": "feed_pk = :pk AND version > :since",
+            "ExpressionAttributeValues": _to_item(
+                {":pk": FEED_PARTITION, ":since": since}
+            ),
+            "Limit": limit,
+        }
+        if after is not None:
+            kwargs["ExclusiveStartKey"] = _to_item(
+                {"feed_pk": FEED_PARTITION, "version": after[0], "id": after[1]}
+            )
+        result = await self._client.call("query", **kwargs)
+        rows = [_to_row(_from_item(item)) for item in result.get("Items", [])]
+        last_key = result.get("LastEvaluatedKey")
+        if not last_key:
+            return rows, None
+        last_key = _from_item(last_key)
+        return rows, (last_key["version"], last_key["id"])
+
+    async def head_version(self) -> int:
+        response = await self._client.call(
+            "query",
+            TableName=TABLE_NAME,
+            IndexName=FEED_INDEX,
+            KeyConditionExpression="feed_pk = :pk",
+            ExpressionAttributeValues=_to_item({":pk": FEED_PARTITION}),
+            ScanIndexForward=False,
+            Limit=1,
+            ProjectionExpression="version",
+        )
+        items = response.get("Items", [])
+        return _from_item(items[0])["version"] if items else 0
+
+    async def create(self, row: dict) -> bool:
+        try:
+            await self._client.call(
+                "put_item",
+                TableName=TABLE_NAME,
+                Item=_to_item(_to_stored(row)),
+                ConditionExpression="attribute_not_exists(id)",
+            )
+        except Exception as exc:
+            if _is_condition_failure(exc):
+                return False
+            raise
+        return True
+
+    async def delete(
+        self, todo_id: int, version: int, expires_at: int
+    ) -> dict | None:
+        try:
+            response = await self._client.call(
+                "update_item",
+                TableName=TABLE_NAME,
+                Key=_to_item({"id": todo_id}),
+                UpdateExpression=(
+                    "SET version = :version, deleted = :deleted, "
+                    "expires_at = :expires_at REMOVE list_pk"
+                ),
+                ConditionExpression="attribute_exists(list_pk)",
+                ExpressionAttributeValues=_to_item(
+                    {":version": version, ":deleted": True, ":expires_at": expires_at}
+                ),
+                ReturnValues="ALL_NEW",
+            )
+        except Exception as exc:
+            if _is_condition_failure(exc):
+                return None
+            raise
+        return _to_row(_from_item(response["Attributes"]))
+
+    async def get_many(self, ids: list[int]) -> dict[int, dict]:
+        return {
+            item["id"]: _to_row(item)
+            for item in await self._batch_get(ids)
+            if item.get("list_pk") == LIST_PARTITION
+        }
+
+    async def taken_ids(self, ids: list[int]) -> set[int]:
+        items = await self._batch_get(ids, ProjectionExpression="id")
+        return {item["id"] for item in items}
+
+    async def _batch_get(self, ids: list[int], **options) -> list[dict]:
+        """BatchGetItem in 100-key calls, retrying UnprocessedKeys."""
+        found = []
+        for start in range(0, len(ids), BATCH_GET_SIZE):
+            keys = [
+                _to_item({"id": todo_id})
+                for todo_id in ids[start : start + BATCH_GET_SIZE]
+            ]
+            request = {TABLE_NAME: {"Keys": keys, **options}}
+            for attempt in range(BATCH_MAX_ATTEMPTS):
+                response = await self._client.call(
+                    "batch_get_item", RequestItems=request
+                )
+                found.extend(
+                    _from_item(item)
+                    for item in response.get("Responses", {}).get(TABLE_NAME, [])
+                )
+                request = response.get("UnprocessedKeys") or {}
+                if not request:
+                    break
+                await _backoff(attempt)
+            else:
+                raise RuntimeError("BatchGetItem kept returning UnprocessedKeys")
+        return found
+
+    async def put_many(self, rows: list[dict]) -> list[dict]:
+        """BatchWriteItem in 25-item calls.
+
+        UnprocessedItems are retried with backoff; rows still unprocessed
+        after BATCH_MAX_ATTEMPTS are returned to the caller.
+        """
+        failed = []
+        for start in range(0, len(rows), BATCH_WRITE_SIZE):
+            pending = [
+                {"PutRequest": {"Item": _to_item(_to_stored(row))}}
+                for row in rows[start : start + BATCH_WRITE_SIZE]
+            ]
+            for attempt in range(BATCH_MAX_ATTEMPTS):
+                response = await self._client.call(
+                    "batch_write_item", RequestItems={TABLE_NAME: pending}
+                )
+                pending = response.get("UnprocessedItems", {}).get(TABLE_NAME, [])
+                if not pending:
+                    break
+                await _backoff(attempt)
+            failed.extend(
+                _to_row(_from_item(req["PutRequest"]["Item"])) for req in pending
+            )
+        return failed
+
+    async def scan(self) -> AsyncIterator[list[dict]]:
+        """Parallel Scan of the sparse `by_id` index (live rows only)."""
+        async for page in aparallel_scan(
+            functools.partial(self._client.call, "scan"),
+            SCAN_SEGMENTS,
+            ("id", "title", "version"),
+            TableName=TABLE_NAME,
+            IndexName=LIST_INDEX,
+        ):
+            yield [_to_row(_from_item(item)) for item in page]
+
+    async def migrate(self, version: int) -> int:
+        """Create the counter item and backfill rows that predate the
+        list/feed indexes so they show up in GET /api/todos."""
+        try:
+            await self._client.call(
+                "put_item",
+                TableName=TABLE_NAME,
+                Item=_to_item({"id": 0, "counter_value": 0, "title": "__counter__"}),
+                ConditionExpression="attribute_not_exists(id)",
+            )
+        except Exception as exc:
+            if not _is_condition_failure(exc):
+                raise
+        backfilled = 0
+        async for page in aparallel_scan(
+            functools.partial(self._client.call, "scan"),
+            SCAN_SEGMENTS,
+            TableName=TABLE_NAME,
+            FilterExpression="attribute_not_exists(feed_pk) AND id <> :counter",
+            ExpressionAttributeValues=_to_item({":counter": 0}),
+        ):
+            rows = [
+                {"id": item["id"], "title": item["title"], "version": version}
+                for item in map(_from_item, page)
+            ]
+            failed = await self.put_many(rows)
+            if failed:
+                raise RuntimeError(f"{len(failed)} rows could not be backfilled")
+            backfilled += len(rows)
+        return backfilled
+
+    async def close(self) -> None:
+        await self._client.close()
@@ -1,43 +1,552 @@
+import time
+
+# Taken before any other import so the cold-start report can attribute
+# module import time (run `python -X importtime main.py` for per-module detail).
+_INIT_STARTED = time.perf_counter()
+
+import asyncio
+import base64
+import binascii
+import functools
+import hashlib
+import inspect
+import json
 import os
+import random
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 
-import boto3
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
 from mangum import Mangum
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
+from starlette.datastructures import MutableHeaders
 
-# --- DynamoDB setup ---
-TABLE_NAME = os.getenv("DYNAMODB_TABLE", "sample-agentitest-todos")
-REGION = os.getenv("AWS_REGION_NAME", "ap-northeast-1")
+import tracing
+from repository import TodoRepository, make_repository
 
-dynamodb = boto3.resource("dynamodb", region_name=REGION)
-table = dynamodb.Table(TABLE_NAME)
 
+# --- Cold start accounting ---
+class ColdStartTimer:
+    """Break container init time down into phases and log it once.
 
-def _ensure_counter():
-    """Initialize the atomic counter item if it doesn't exist."""
-    try:
-        table.put_item(
-            Item={"id": 0, "counter_value": 0, "title": "__counter__"},
-            ConditionExpression="attribute_not_exists(id)",
-        )
-    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
-        pass
+    Phases: `imports` (module imports), `app` (FastAPI app and routes) and
+    `sdk` (storage SDK import + client creation, which happens on first use).
+    """
+
+    def __init__(self, started: float) -> None:
+        self._last = started
+        self.phases: dict[str, float] = {}
+        self._reported = False
+
+    def mark(self, phase: str) -> None:
+        """Close `phase` at the current time."""
+        now = time.perf_counter()
+        self.phases[phase] = round((now - self._last) * 1000, 2)
+        self._last = now
+
+    def record(self, phase: str, started: float) -> None:
+        """Record a phase that did not run back-to-back with the others."""
+        self.phases[phase] = round((time.perf_counter() - started) * 1000, 2)
+
+    def report(self) -> None:
+        if self._reported:
+            return
+        self._reported = True
+        print(json.dumps({"cold_start_ms": self.phases}))
+
+
+cold_start = ColdStartTimer(_INIT_STARTED)
+cold_start.mark("imports")
+
+# --- Storage ---
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Every write stamps the row with a time-ordered `version`, so ordering rows
+# by version gives a change feed. Deletes leave a tombstone that expires
+# after TOMBSTONE_TTL_SECONDS; a `since` older than that can no longer be
+# served.
+TOMBSTONE_TTL_SECONDS = int(os.getenv("TODO_TOMBSTONE_TTL_SECONDS", str(7 * 86400)))
+# Versions come from per-container clocks, so a feed read re-sends changes
+# from this window before `since` to cover clock skew between writers.
+SYNC_OVERLAP_MS = int(os.getenv("TODO_SYNC_OVERLAP_MS", "5000"))
+
+BATCH_MAX_ITEMS = 1000
+# Batch deletes up to this size use one conditional delete per todo, which
+# cannot tombstone a row deleted or recreated since it was looked up.
+BATCH_CONDITIONAL_DELETE_MAX = int(os.getenv("TODO_BATCH_CONDITIONAL_DELETE_MAX", "25"))
+
+# Build the storage client during init instead of on the first request
+# (useful with provisioned concurrency, where init is pre-warmed).
+EAGER_INIT = os.getenv("TODO_EAGER_INIT", "false").lower() in ("true", "1")
+
+_repo: TodoRepository | None = None
+_repo_lock = threading.Lock()
+
+
+def _repository() -> TodoRepository:
+    """Return the shared repository (TODO_STORAGE), creating it on first use."""
+    global _repo
+    if _repo is None:
+        with _repo_lock:
+            if _repo is None:
+                started = time.perf_counter()
+                _repo = _TracedRepository(make_repository())
+                cold_start.record("sdk", started)
+                cold_start.report()
+    return _repo
+
+
+class _TracedRepository:
+    """Time every repository call into the `db` phase of sampled traces."""
+
+    def __init__(self, repository: TodoRepository) -> None:
+        self._repository = repository
+
+    def __getattr__(self, name: str):
+        method = getattr(self._repository, name)
+        if tracing.current() is None or inspect.isasyncgenfunction(method):
+            return method
+
+        @functools.wraps(method)
+        async def traced(*args, **kwargs):
+            with tracing.span("db"):
+                return await method(*args, **kwargs)
+
+        return traced
+
+
+# --- ID allocation ---
+ID_ALLOCATOR = os.getenv("TODO_ID_ALLOCATOR", "block")
+ID_BLOCK_SIZE = int(os.getenv("TODO_ID_BLOCK_SIZE", "50"))
+
+
+class BlockIdAllocator:
+    """Lease ranges of ids from the counter item and hand them out locally.
+
+    One atomic ADD reserves `block_size` ids for this container, so most
+    creates never touch the counter item. Ids are unique but only roughly
+    time-ordered across containers. `block_size=1` is the classic
+    one-update-per-create counter.
+    """
+
+    def __init__(self, block_size: int) -> None:
+        self._block_size = max(1, block_size)
+        self._next = 0
+        self._end = 0  # exclusive
+        self._lock = threading.Lock()
+
+    async def allocate(self, count: int = 1) -> list[int]:
+        """Return `count` new ids, reserving at most one new block.
+
+        The lock is never held across the reservation round trip; if two
+        requests reserve concurrently, the remainder of one block is skipped.
+        """
+        with self._lock:
+            ids = list(range(self._next, min(self._next + count, self._end)))
+            self._next += len(ids)
+        shortfall = count - len(ids)
+        if shortfall:
+            size = max(shortfall, self._block_size)
+            start = await self._reserve(size) - size + 1
+            ids.extend(range(start, start + shortfall))
+            with self._lock:
+                self._next, self._end = start + shortfall, start + size
+        return ids
+
+    async def _reserve(self, size: int) -> int:
+        """Atomically advance the counter by `size` and return its new value."""
+        return await _repository().reserve_ids(size)
+
+
+class TimeOrderedIdAllocator:
+    """Snowflake-style ids generated without any storage call.
+
+    Layout: milliseconds since ID_EPOCH_MS (41 bits) followed by a 12-bit
+    sequence, which keeps ids below 2**53 so browsers can handle them as
+    plain numbers. The sequence starts at a random offset every millisecond
+    to make cross-container collisions unlikely; the conditional put in
+    create_todo catches the rest. Ids are always larger than counter ids,
+    so switching from `block`/`counter` to `time` keeps the list ordered.
+    """
+
+    ID_EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+    SEQUENCE_BITS = 12
+
+    def __init__(self) -> None:
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    async def allocate(self, count: int = 1) -> list[int]:
+        return self.allocate_now(count)
 
+    def allocate_now(self, count: int = 1) -> list[int]:
+        """Synchronous variant; this allocator never does I/O."""
+        with self._lock:
+            return [self._next() for _ in range(count)]
 
-def _next_id() -> int:
-    """Atomically increment and return the next todo ID."""
-    response = table.update_item(
-        Key={"id": 0},
-        UpdateExpression="ADD counter_value :inc",
-        ExpressionAttributeValues={":inc": 1},
-        ReturnValues="UPDATED_NEW",
+    def _next(self) -> int:
+        max_sequence = (1 << self.SEQUENCE_BITS) - 1
+        now_ms = int(time.time() * 1000)
+        if now_ms <= self._last_ms:
+            now_ms = self._last_ms
+            self._sequence += 1
+            if self._sequence > max_sequence:
+                now_ms += 1
+                self._sequence = 0
+        else:
+            self._sequence = random.randint(0, max_sequence // 2)
+        self._last_ms = now_ms
+        return ((now_ms - self.ID_EPOCH_MS) << self.SEQUENCE_BITS) | self._sequence
+
+
+def _make_id_allocator(name: str):
+    if name == "counter":
+        return BlockIdAllocator(1)
+    if name == "block":
+        return BlockIdAllocator(ID_BLOCK_SIZE)
+    if name == "time":
+        return TimeOrderedIdAllocator()
+    raise ValueError(f"Unknown TODO_ID_ALLOCATOR: {name!r}")
+
+
+id_allocator = _make_id_allocator(ID_ALLOCATOR)
+
+
+async def _next_id() -> int:
+    """Return the next todo ID from the configured allocator."""
+    with tracing.span("id"):
+        return (await id_allocator.allocate())[0]
+
+
+# --- Change versions ---
+version_clock = TimeOrderedIdAllocator()
+
+
+def _next_version() -> int:
+    """Return a time-ordered version for the next change."""
+    return version_clock.allocate_now()[0]
+
+
+def _version_floor(ms_ago: int) -> int:
+    """Return the smallest version a change made `ms_ago` ms ago could have."""
+    now_ms = int(time.time() * 1000)
+    return max(0, now_ms - ms_ago - TimeOrderedIdAllocator.ID_EPOCH_MS) << (
+        TimeOrderedIdAllocator.SEQUENCE_BITS
     )
-    return int(response["Attributes"]["counter_value"])
+
+
+def _is_settled(version: int) -> bool:
+    """True once a change made at `version` can be assumed visible everywhere.
+
+    The list and feed GSIs are updated asynchronously, so right after a write
+    one index can show it while the other does not yet. A change older than
+    SYNC_OVERLAP_MS (which also covers clock skew between writers) is treated
+    as propagated to both.
+    """
+    return version < _version_floor(SYNC_OVERLAP_MS)
+
+
+def _todo_item(todo_id: int, title: str, version: int) -> dict:
+    """Build a live todo row."""
+    return {"id": todo_id, "title": title, "version": version, "deleted": False}
+
+
+def _tombstone_item(todo_id: int, title: str, version: int) -> dict:
+    """Build the row a deleted todo leaves in the change feed."""
+    return {
+        "id": todo_id,
+        "title": title,
+        "version": version,
+        "deleted": True,
+        "expires_at": _tombstone_expiry(),
+    }
+
+
+def _tombstone_expiry() -> int:
+    return int(time.time()) + TOMBSTONE_TTL_SECONDS
+
+
+def _list_item(item: dict) -> dict:
+    """Serialize a live row for GET /api/todos."""
+    return {
+        "id": int(item["id"]),
+        "title": item["title"],
+        "version": int(item.get("version", 0)),
+    }
+
+
+def _change(item: dict) -> dict:
+    """Serialize a row as a versioned change record."""
+    return {
+        "id": int(item["id"]),
+        "title": item["title"],
+        "version": int(item["version"]),
+        "deleted": bool(item.get("deleted", False)),
+    }
+
+
+def _encode_cursor(position: dict) -> str:
+    """Turn a resume position into an opaque, URL-safe cursor."""
+    raw = json.dumps({k: int(v) for k, v in position.items()}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, fields: tuple[str, ...] = ("id",)) -> dict:
+    """Read the resume position back from a cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        return {field: int(data[field]) for field in fields}
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# --- Read cache ---
+CACHE_TTL_SECONDS = float(os.getenv("TODO_CACHE_TTL_SECONDS", "5"))
+CACHE_MAX_ENTRIES = int(os.getenv("TODO_CACHE_MAX_ENTRIES", "64"))
+CACHE_VALIDATE = os.getenv("TODO_CACHE_VALIDATE", "false").lower() in ("true", "1")
+# Conditional GET: the ETag is a hash of the response body, so it always
+# describes what was sent even while the GSIs disagree or the head version
+# moves back. A 304 saves the transfer, not the page read; the feed head is
+# still read per request (one single-item Query) and validates cached pages.
+ETAG_ENABLED = os.getenv("TODO_ETAG", "true").lower() in ("true", "1")
+
+
+class PageCache:
+    """Per-container TTL/LRU cache of list pages keyed by (limit, cursor).
+
+    With TODO_CACHE_VALIDATE or TODO_ETAG on (the default), every lookup
+    compares the head of the change feed against the version the page was
+    cached under, so any write, local or not, makes the page miss.
+
+    In TTL-only mode (both off) local writes patch cached pages in place
+    (`apply_create`/`apply_delete`) and keep being served as hits; writes
+    from other containers are only noticed once the TTL expires.
+
+    A page read within `settle` seconds of a local write may come from an
+    index that does not show the write yet, so it is not cached (callers
+    also skip `put` while the feed head is not settled).
+    """
+
+    def __init__(self, ttl: float, max_entries: int, settle: float = 0.0) -> None:
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._settle = settle
+        self._entries: OrderedDict[tuple, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self._written = float("-inf")  # monotonic time of the last local write
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple, version: int | None = None) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if (
+                entry is None
+                or entry["expires"] < time.monotonic()
+                or entry["version"] != version
+            ):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return {"items": list(entry["items"]), "next_cursor": entry["next_cursor"]}
+
+    def put(
+        self,
+        key: tuple,
+        lower: int,
+        upper: int | None,
+        page: dict,
+        version: int | None = None,
+    ):
+        """Cache `page`, which covers ids in (lower, upper]; None = no bound."""
+        if self._max_entries <= 0:
+            return
+        with self._lock:
+            if time.monotonic() - self._written < self._settle:
+                return
+            self._entries[key] = {
+                "limit": key[0],
+                "lower": lower,
+                "upper": upper,
+                "items": list(page["items"]),
+                "next_cursor": page["next_cursor"],
+                "version": version,
+                "expires": time.monotonic() + self._ttl,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def apply_create(self, todo: dict) -> None:
+        """Insert a new todo into the page whose id range covers it."""
+        with self._lock:
+            self._written = time.monotonic()
+            for key, entry in list(self._entries.items()):
+                items = entry["items"]
+                upper = entry["upper"]
+                if todo["id"] <= entry["lower"] or (
+                    upper is not None and todo["id"] > upper
+                ):
+                    continue
+                if len(items) >= entry["limit"]:
+                    del self._entries[key]
+                    continue
+                items.append(todo)
+                items.sort(key=lambda x: x["id"])
+
+    def apply_delete(self, todo_ids: set[int]) -> None:
+        """Drop deleted todos from any cached page that holds them."""
+        with self._lock:
+            self._written = time.monotonic()
+            for entry in self._entries.values():
+                entry["items"] = [t for t in entry["items"] if t["id"] not in todo_ids]
+
+    def clear(self) -> None:
+        """Drop every page (after a write that cannot be patched in)."""
+        with self._lock:
+            self._written = time.monotonic()
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+page_cache = PageCache(CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES, SYNC_OVERLAP_MS / 1000)
+
+
+async def _read_version() -> int | None:
+    """Return the newest change version when validating or emitting ETags."""
+    if not (CACHE_VALIDATE or ETAG_ENABLED):
+        return None
+    return await _repository().head_version()
+
+
+def _page_etag(body: dict) -> str:
+    """Weak ETag for a list response."""
+    digest = hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against `etag`."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in candidates
+
+
+# --- Tracing ---
+# Phases of a sampled request (ms): `mangum` (Lambda event translation),
+# `validate` (request models), `id` (id allocation), `db` (storage calls),
+# `handler` (endpoint body), `serialize` (endpoint return to response start)
+# and `app` (whole ASGI app). See tracing.py for sampling and the log format.
+class TracingMiddleware:
+    """Add Server-Timing to sampled responses and log their trace.
+
+    Under Lambda the trace is opened by `handler` so it also covers Mangum's
+    event translation, and is logged there once the response is built.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        trace = tracing.current()
+        owner = trace is None
+        if owner:
+            trace = tracing.start()
+            if trace is None:
+                return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        if not owner:
+            trace.add("mangum", trace.started)
+
+        async def send_traced(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+                if "handler" in trace.marks:
+                    trace.add("serialize", trace.marks.pop("handler"))
+                trace.add("app", started)
+                MutableHeaders(scope=message).append(
+                    "Server-Timing", trace.server_timing()
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_traced)
+        finally:
+            route = scope.get("route")
+            trace.route = f"{scope['method']} {route.path}" if route else None
+            if owner:
+                tracing.end(trace)
+                trace.emit()
+
+
+def _timed_endpoint(endpoint):
+    """Wrap an async endpoint so traces record its run time."""
+
+    @functools.wraps(endpoint)
+    async def timed(*args, **kwargs):
+        trace = tracing.current()
+        if trace is None:
+            return await endpoint(*args, **kwargs)
+        with tracing.span("handler"):
+            result = await endpoint(*args, **kwargs)
+        # Read back by TracingMiddleware to time serialization.
+        trace.marks["handler"] = time.perf_counter()
+        return result
+
+    return timed
+
+
+class TracedRoute(APIRoute):
+    """APIRoute whose endpoint is wrapped by `_timed_endpoint`."""
+
+    def __init__(self, path: str, endpoint, **kwargs) -> None:
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+
+class TracedModel(BaseModel):
+    """Request model whose validation time is recorded in traces."""
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def _timed(cls, data, handler):
+        with tracing.span("validate"):
+            return handler(data)
 
 
 # --- FastAPI app ---
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if _repo is not None:
+        await _repo.close()
+
+
+app = FastAPI(lifespan=lifespan)
+app.router.route_class = TracedRoute
 
 app.add_middleware(
     CORSMiddleware,
@@ -45,48 +554,305 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(TracingMiddleware)
 
 
-class TodoCreate(BaseModel):
+class TodoCreate(TracedModel):
     title: str
 
 
-@app.on_event("startup")
-def startup():
-    _ensure_counter()
+class TodoBatchCreate(TracedModel):
+    items: list[TodoCreate] = Field(max_length=BATCH_MAX_ITEMS)
+
+
+class TodoBatchDelete(TracedModel):
+    ids: list[int] = Field(max_length=BATCH_MAX_ITEMS)
 
 
 @app.get("/api/todos")
-def get_todos():
-    response = table.scan()
-    items = response.get("Items", [])
-    todos = [
-        {"id": int(item["id"]), "title": item["title"]}
-        for item in items
-        if item["id"] != 0
-    ]
-    todos.sort(key=lambda x: x["id"])
-    return todos
+async def get_todos(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    since: int | None = Query(None, ge=0),
+    if_none_match: str | None = Header(None),
+):
+    if since is not None:
+        return await _query_changes(since, limit, cursor)
+    key = (limit, cursor)
+    # Also returned as `version` so the client can start `since` sync from
+    # the list; read before the page, so later changes are never skipped.
+    # In TTL-only mode it is not read and `version` is null.
+    version = await _read_version()
+    page = page_cache.get(key, version)
+    response.headers["X-Cache"] = "hit" if page else "miss"
+    if page is None:
+        lower = _decode_cursor(cursor)["id"] if cursor else 0
+        rows, upper = await _repository().list_page(limit, lower or None)
+        page = {
+            "items": [_list_item(row) for row in rows],
+            "next_cursor": _encode_cursor({"id": upper}) if upper else None,
+        }
+        if version is None or _is_settled(version):
+            page_cache.put(key, lower, upper, page, version)
+    body = {**page, "version": version}
+    if ETAG_ENABLED:
+        etag = _page_etag(body)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+    return body
+
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    return page_cache.stats()
+
+
+@app.get("/api/todos/export")
+async def export_todos(ordered: bool = False):
+    """Stream every live todo as NDJSON, one page at a time.
+
+    Memory stays at a few pages whatever the table size. The default reads
+    storage with a parallel scan (no order); `ordered=true` walks the id
+    index instead, which is slower on DynamoDB but yields ascending ids.
+    Mangum buffers the whole body, so streaming only pays off under uvicorn.
+    """
+    return StreamingResponse(
+        _export_lines(ordered),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+async def _export_lines(ordered: bool):
+    repository = _repository()
+    if ordered:
+        pages = _ordered_pages(repository)
+    else:
+        pages = repository.scan()
+    async for rows in pages:
+        yield "".join(json.dumps(_list_item(row)) + "\n" for row in rows)
+
+
+async def _ordered_pages(repository: TodoRepository):
+    after_id = None
+    while True:
+        rows, after_id = await repository.list_page(MAX_PAGE_SIZE, after_id)
+        if rows:
+            yield rows
+        if after_id is None:
+            return
+
+
+async def _query_changes(since: int, limit: int, cursor: str | None) -> dict:
+    """Return changes after `since` from the change feed.
+
+    Changes are idempotent upserts/tombstones, so the overlap window may
+    repeat a few the client already has. Follow `next_cursor` until it is
+    null, then pass the returned `version` as the next `since`.
+    `since=0` reads the whole retained feed (a client with nothing yet).
+    """
+    if 0 < since < _version_floor(TOMBSTONE_TTL_SECONDS * 1000):
+        raise HTTPException(
+            status_code=410, detail="Version too old; reload the full list"
+        )
+    overlap = SYNC_OVERLAP_MS << TimeOrderedIdAllocator.SEQUENCE_BITS
+    after = None
+    if cursor:
+        position = _decode_cursor(cursor, ("version", "id"))
+        after = (position["version"], position["id"])
+    rows, after = await _repository().changes(max(0, since - overlap), limit, after)
+    changes = [_change(row) for row in rows]
+    return {
+        "changes": changes,
+        "version": max([since] + [c["version"] for c in changes]),
+        "next_cursor": (
+            _encode_cursor({"version": after[0], "id": after[1]}) if after else None
+        ),
+    }
 
 
 @app.post("/api/todos", status_code=201)
-def create_todo(todo: TodoCreate):
-    new_id = _next_id()
-    table.put_item(Item={"id": new_id, "title": todo.title})
-    return {"id": new_id, "title": todo.title}
+async def create_todo(todo: TodoCreate):
+    # Retry covers the rare time-ordered id collision between containers.
+    for _ in range(3):
+        item = _todo_item(await _next_id(), todo.title, _next_version())
+        if not await _repository().create(item):
+            continue
+        page_cache.apply_create(_list_item(item))
+        return _change(item)
+    raise HTTPException(status_code=503, detail="Could not allocate a todo ID")
 
 
 @app.delete("/api/todos/{todo_id}")
-def delete_todo(todo_id: int):
-    response = table.delete_item(
-        Key={"id": todo_id},
-        ReturnValues="ALL_OLD",
+async def delete_todo(todo_id: int):
+    # Turn the row into a tombstone so `since` readers see the delete.
+    tombstone = await _repository().delete(
+        todo_id, _next_version(), _tombstone_expiry()
     )
-    old_item = response.get("Attributes")
-    if not old_item or old_item.get("id") == 0:
+    if tombstone is None:
         raise HTTPException(status_code=404, detail="Todo not found")
-    return {"id": int(old_item["id"]), "title": old_item["title"]}
+    page_cache.apply_delete({todo_id})
+    return _change(tombstone)
+
+
+@app.post("/api/todos:batch")
+async def create_todos_batch(batch: TodoBatchCreate):
+    # All ids come from one allocator call (at most one counter update).
+    with tracing.span("id"):
+        new_ids = await id_allocator.allocate(len(batch.items)) if batch.items else []
+    new_ids = await _reallocate_taken(new_ids)
+    items = [
+        _todo_item(new_id, todo.title, _next_version())
+        for new_id, todo in zip(new_ids, batch.items)
+    ]
+    failed_ids = {item["id"] for item in await _repository().put_many(items)}
+    if len(failed_ids) < len(items):
+        page_cache.clear()
+    return {
+        "results": [
+            {
+                **_change(item),
+                "status": "failed" if item["id"] in failed_ids else "created",
+            }
+            for item in items
+        ]
+    }
+
+
+async def _reallocate_taken(new_ids: list[int]) -> list[int]:
+    """Replace ids that already have a row before an unconditional batch put.
+
+    Only `time` ids can collide (across containers); counter blocks are
+    unique. A collision in the moment between this check and the write is
+    still possible, but needs two containers to pick the same random
+    sequence in the same millisecond.
+    """
+    if not isinstance(id_allocator, TimeOrderedIdAllocator):
+        return new_ids
+    for _ in range(3):
+        taken = await _repository().taken_ids(new_ids)
+        if not taken:
+            return new_ids
+        replacements = iter(id_allocator.allocate_now(len(taken)))
+        new_ids = [next(replacements) if i in taken else i for i in new_ids]
+    raise HTTPException(status_code=503, detail="Could not allocate todo IDs")
+
+
+@app.delete("/api/todos:batch")
+async def delete_todos_batch(batch: TodoBatchDelete):
+    """Delete todos and return a per-id status.
+
+    Small batches delete each todo conditionally. Larger ones look the rows
+    up and then write tombstones with BatchWriteItem, which is best-effort:
+    a todo deleted or recreated between the two calls gets a stale tombstone.
+    """
+    ids = list(dict.fromkeys(batch.ids))
+    if len(ids) <= BATCH_CONDITIONAL_DELETE_MAX:
+        return {"results": await _delete_each(ids)}
+    try:
+        existing = await _repository().get_many(ids)
+    except RuntimeError:
+        raise HTTPException(status_code=503, detail="Todo lookup throttled")
+    tombstones = {
+        todo_id: _tombstone_item(todo_id, item["title"], _next_version())
+        for todo_id, item in existing.items()
+    }
+    failed_ids = {
+        item["id"]
+        for item in await _repository().put_many(list(tombstones.values()))
+    }
+    deleted_ids = tombstones.keys() - failed_ids
+    if deleted_ids:
+        page_cache.apply_delete(deleted_ids)
+    results = []
+    for todo_id in ids:
+        if todo_id not in tombstones:
+            results.append({"id": todo_id, "status": "not_found"})
+            continue
+        results.append(
+            {
+                **_change(tombstones[todo_id]),
+                "status": "failed" if todo_id in failed_ids else "deleted",
+            }
+        )
+    return {"results": results}
+
+
+async def _delete_each(ids: list[int]) -> list[dict]:
+    """Delete todos one conditional call at a time, concurrently."""
+    outcomes = await asyncio.gather(
+        *(
+            _repository().delete(todo_id, _next_version(), _tombstone_expiry())
+            for todo_id in ids
+        ),
+        return_exceptions=True,
+    )
+    deleted_ids = {t["id"] for t in outcomes if isinstance(t, dict)}
+    if deleted_ids:
+        page_cache.apply_delete(deleted_ids)
+    results = []
+    for todo_id, outcome in zip(ids, outcomes):
+        if outcome is None:
+            results.append({"id": todo_id, "status": "not_found"})
+        elif isinstance(outcome, Exception):
+            results.append({"id": todo_id, "status": "failed"})
+        else:
+            results.append({**_change(outcome), "status": "deleted"})
+    return results
+
+
+cold_start.mark("app")
+if EAGER_INIT:
+    _repository()
+
+# No startup hooks remain, so skip Mangum's lifespan cycle.
+_mangum = Mangum(app, lifespan="off")
+
+
+def handler(event, context):
+    """Lambda handler; traces include Mangum's event translation.
+
+    A `{"action": "migrate"}` event (sent by Terraform after every deploy)
+    runs the storage migration instead of an HTTP request.
+    """
+    if event.get("action") == "migrate":
+        # Run on the loop Mangum set up at import: `asyncio.run` would close
+        # it and break every HTTP event this container serves afterwards.
+        loop = asyncio.get_event_loop()
+        return {"backfilled": loop.run_until_complete(_migrate())}
+    trace = tracing.start()
+    if trace is None:
+        return _mangum(event, context)
+    try:
+        return _mangum(event, context)
+    finally:
+        tracing.end(trace)
+        app_ms = trace.phases.get("app", 0.0)
+        trace.phases["mangum"] = (time.perf_counter() - trace.started) * 1000 - app_ms
+        trace.emit()
+
+
+async def _migrate() -> int:
+    """Prepare storage and backfill rows; safe to run any number of times.
+
+    On DynamoDB this creates the counter item and gives rows written before
+    the list/feed indexes existed the attributes they need to show up in
+    GET /api/todos.
+    """
+    return await _repository().migrate(_next_version())
+
+
+async def migrate() -> None:
+    """One-shot maintenance from the command line (see `_migrate`)."""
+    backfilled = await _migrate()
+    print(f"Counter ensured, {backfilled} rows backfilled")
+    await _repository().close()
 
 
-# Lambda handler
-handler = Mangum(app)
+if __name__ == "__main__":
+    if sys.argv[1:] != ["migrate"]:
+        sys.exit("usage: python main.py migrate")
+    asyncio.run(migrate())
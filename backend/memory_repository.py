@@ -0,0 +1,133 @@
+"""In-process TodoRepository for benchmarks and offline runs.
+
+No method awaits anything, so each call runs to completion on the event
+loop without interleaving and needs no locks. Data lives only as long as
+the process. Every write also drops expired tombstones (what DynamoDB TTL
+does in production).
+"""
+
+import bisect
+import heapq
+import time
+from collections.abc import AsyncIterator
+
+SCAN_PAGE_SIZE = 1000
+
+
+class MemoryTodoRepository:
+    def __init__(self) -> None:
+        self._rows: dict[int, dict] = {}
+        self._live_ids: list[int] = []  # sorted
+        self._feed: list[tuple[int, int]] = []  # sorted (version, id)
+        self._expiry: list[tuple[int, int]] = []  # heap of (expires_at, id)
+        self._counter = 0
+
+    async def reserve_ids(self, size: int) -> int:
+        self._counter += size
+        return self._counter
+
+    async def list_page(
+        self, limit: int, after_id: int | None
+    ) -> tuple[list[dict], int | None]:
+        start = bisect.bisect_right(self._live_ids, after_id or 0)
+        ids = self._live_ids[start : start + limit]
+        more = start + limit < len(self._live_ids)
+        return [dict(self._rows[i]) for i in ids], ids[-1] if more else None
+
+    async def changes(
+        self, since: int, limit: int, after: tuple[int, int] | None
+    ) -> tuple[list[dict], tuple[int, int] | None]:
+        start = bisect.bisect_right(self._feed, after or (since, float("inf")))
+        keys = self._feed[start : start + limit]
+        more = start + limit < len(self._feed)
+        return [dict(self._rows[i]) for _, i in keys], keys[-1] if more else None
+
+    async def head_version(self) -> int:
+        return self._feed[-1][0] if self._feed else 0
+
+    async def create(self, row: dict) -> bool:
+        self._purge_expired()
+        if row["id"] in self._rows:
+            return False
+        self._write(row)
+        return True
+
+    async def delete(
+        self, todo_id: int, version: int, expires_at: int
+    ) -> dict | None:
+        self._purge_expired()
+        row = self._rows.get(todo_id)
+        if row is None or row["deleted"]:
+            return None
+        tombstone = {
+            **row,
+            "version": version,
+            "deleted": True,
+            "expires_at": expires_at,
+        }
+        self._write(tombstone)
+        return dict(tombstone)
+
+    async def get_many(self, ids: list[int]) -> dict[int, dict]:
+        return {
+            i: dict(self._rows[i])
+            for i in ids
+            if i in self._rows and not self._rows[i]["deleted"]
+        }
+
+    async def taken_ids(self, ids: list[int]) -> set[int]:
+        return {i for i in ids if i in self._rows}
+
+    async def put_many(self, rows: list[dict]) -> list[dict]:
+        self._purge_expired()
+        for row in rows:
+            self._write(row)
+        return []
+
+    async def scan(self) -> AsyncIterator[list[dict]]:
+        after_id = None
+        while True:
+            rows, after_id = await self.list_page(SCAN_PAGE_SIZE, after_id)
+            if rows:
+                yield rows
+            if after_id is None:
+                return
+
+    async def migrate(self, version: int) -> int:
+        return 0
+
+    async def close(self) -> None:
+        pass
+
+    def _write(self, row: dict) -> None:
+        """Store `row` and keep the id and version indexes in step."""
+        old = self._rows.get(row["id"])
+        if old is not None:
+            self._remove_sorted(self._feed, (old["version"], old["id"]))
+            if not old["deleted"]:
+                self._remove_sorted(self._live_ids, old["id"])
+        row = {"deleted": False, **row}
+        self._rows[row["id"]] = row
+        bisect.insort(self._feed, (row["version"], row["id"]))
+        if not row["deleted"]:
+            bisect.insort(self._live_ids, row["id"])
+        elif row.get("expires_at") is not None:
+            heapq.heappush(self._expiry, (row["expires_at"], row["id"]))
+
+    def _purge_expired(self) -> None:
+        """Drop tombstones past `expires_at`."""
+        now = int(time.time())
+        while self._expiry and self._expiry[0][0] < now:
+            expires_at, todo_id = heapq.heappop(self._expiry)
+            row = self._rows.get(todo_id)
+            # Skip heap entries for rows rewritten since (revived or re-deleted).
+            if row is None or not row["deleted"] or row.get("expires_at") != expires_at:
+                continue
+            del self._rows[todo_id]
+            self._remove_sorted(self._feed, (row["version"], todo_id))
+
+    @staticmethod
+    def _remove_sorted(values: list, value) -> None:
+        index = bisect.bisect_left(values, value)
+        if index < len(values) and values[index] == value:
+            del values[index]
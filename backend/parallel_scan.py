@@ -0,0 +1,134 @@
+"""Parallel segmented DynamoDB Scan.
+
+Splits a table (or index) into `total_segments` Scan segments and reads
+them concurrently, yielding pages as they arrive. Each segment follows its
+own LastEvaluatedKey, and at most `max_pending` pages are buffered, so
+memory stays bounded however large the table is.
+
+`scan` is anything with DynamoDB's Scan signature: a boto3 client's
+`scan` (pass TableName=...) or a resource Table's `scan` for the threaded
+`parallel_scan`, or an async equivalent for `aparallel_scan`. This module
+only uses the standard library so the test fixtures can import it too.
+"""
+
+import asyncio
+import queue
+import threading
+from collections.abc import AsyncIterator, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_SEGMENTS = 4
+DEFAULT_FIELDS = ("id", "title")
+
+_DONE = object()
+
+
+def _scan_kwargs(kwargs: dict, fields: tuple[str, ...] | None) -> dict:
+    """Add a ProjectionExpression for `fields` (None = all attributes)."""
+    if not fields:
+        return dict(kwargs)
+    names = {f"#p{i}": field for i, field in enumerate(fields)}
+    return {
+        **kwargs,
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": {
+            **kwargs.get("ExpressionAttributeNames", {}),
+            **names,
+        },
+    }
+
+
+def parallel_scan(
+    scan: Callable[..., dict],
+    total_segments: int = DEFAULT_SEGMENTS,
+    fields: tuple[str, ...] | None = DEFAULT_FIELDS,
+    max_pending: int | None = None,
+    **kwargs,
+) -> Iterator[list[dict]]:
+    """Yield non-empty pages of items, reading segments on a thread pool.
+
+    Closing the generator early stops the readers after their current
+    Scan call.
+    """
+    kwargs = _scan_kwargs(kwargs, fields)
+    pages: queue.Queue = queue.Queue(maxsize=max_pending or total_segments * 2)
+    stop = threading.Event()
+
+    def put(item) -> None:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def read(segment: int) -> None:
+        args = {**kwargs, "Segment": segment, "TotalSegments": total_segments}
+        try:
+            while not stop.is_set():
+                response = scan(**args)
+                if response.get("Items"):
+                    put(response["Items"])
+                if "LastEvaluatedKey" not in response:
+                    break
+                args["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+            put(_DONE)
+        except Exception as exc:
+            put(exc)
+
+    with ThreadPoolExecutor(total_segments, thread_name_prefix="scan") as pool:
+        for segment in range(total_segments):
+            pool.submit(read, segment)
+        try:
+            remaining = total_segments
+            while remaining:
+                page = pages.get()
+                if page is _DONE:
+                    remaining -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield page
+        finally:
+            stop.set()
+
+
+async def aparallel_scan(
+    scan: Callable[..., "asyncio.Future[dict]"],
+    total_segments: int = DEFAULT_SEGMENTS,
+    fields: tuple[str, ...] | None = DEFAULT_FIELDS,
+    max_pending: int | None = None,
+    **kwargs,
+) -> AsyncIterator[list[dict]]:
+    """Async variant of `parallel_scan`: one task per segment."""
+    kwargs = _scan_kwargs(kwargs, fields)
+    pages: asyncio.Queue = asyncio.Queue(maxsize=max_pending or total_segments * 2)
+
+    async def read(segment: int) -> None:
+        args = {**kwargs, "Segment": segment, "TotalSegments": total_segments}
+        try:
+            while True:
+                response = await scan(**args)
+                if response.get("Items"):
+                    await pages.put(response["Items"])
+                if "LastEvaluatedKey" not in response:
+                    break
+                args["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+            await pages.put(_DONE)
+        except Exception as exc:
+            await pages.put(exc)
+
+    tasks = [asyncio.create_task(read(segment)) for segment in range(total_segments)]
+    try:
+        remaining = total_segments
+        while remaining:
+            page = await pages.get()
+            if page is _DONE:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield page
+    finally:
+        for task in tasks:
+            task.cancel()
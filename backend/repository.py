@@ -0,0 +1,86 @@
+"""Storage interface behind the todo API.
+
+Rows exchanged with a repository are plain dicts:
+
+- live todo: ``{"id", "title", "version", "deleted": False}``
+- tombstone: ``{"id", "title", "version", "deleted": True, "expires_at"}``
+
+Ids and versions are allocated by the app (see main.py); repositories only
+store rows, keep them ordered by id (live rows) and by version (all rows),
+and hand out ranges from a persistent id counter.
+"""
+
+import os
+from collections.abc import AsyncIterator
+from typing import Protocol
+
+# "dynamodb" (default), "memory" or "sqlite"
+STORAGE = os.getenv("TODO_STORAGE", "dynamodb")
+
+
+class TodoRepository(Protocol):
+    async def reserve_ids(self, size: int) -> int:
+        """Advance the id counter by `size` and return its new value."""
+
+    async def list_page(
+        self, limit: int, after_id: int | None
+    ) -> tuple[list[dict], int | None]:
+        """Return live rows with id > `after_id` in id order.
+
+        The second element is the id to resume after, or None when the
+        listing is known to be complete.
+        """
+
+    async def changes(
+        self, since: int, limit: int, after: tuple[int, int] | None
+    ) -> tuple[list[dict], tuple[int, int] | None]:
+        """Return rows (live or tombstone) with version > `since` in version
+        order, resuming after the `(version, id)` position `after`."""
+
+    async def head_version(self) -> int:
+        """Return the version of the most recent change, or 0."""
+
+    async def create(self, row: dict) -> bool:
+        """Insert a live row; False if the id is already taken."""
+
+    async def delete(
+        self, todo_id: int, version: int, expires_at: int
+    ) -> dict | None:
+        """Turn a live row into a tombstone and return it; None if missing."""
+
+    async def get_many(self, ids: list[int]) -> dict[int, dict]:
+        """Return the live rows among `ids`, keyed by id."""
+
+    async def taken_ids(self, ids: list[int]) -> set[int]:
+        """Return the ids among `ids` that have a row (live or tombstone)."""
+
+    async def put_many(self, rows: list[dict]) -> list[dict]:
+        """Write rows unconditionally; return the ones that were not written."""
+
+    def scan(self) -> AsyncIterator[list[dict]]:
+        """Yield every live row, a page at a time, in no particular order."""
+
+    async def migrate(self, version: int) -> int:
+        """Prepare storage and backfill rows that predate the current layout
+        with `version`; return the number of rows backfilled."""
+
+    async def close(self) -> None:
+        """Release connections."""
+
+
+def make_repository(name: str = STORAGE) -> TodoRepository:
+    """Build the configured repository. Engines are imported on demand so
+    the Lambda package never loads sqlite3 and local runs never load boto3."""
+    if name == "dynamodb":
+        from dynamodb_repository import DynamoTodoRepository
+
+        return DynamoTodoRepository()
+    if name == "memory":
+        from memory_repository import MemoryTodoRepository
+
+        return MemoryTodoRepository()
+    if name == "sqlite":
+        from sqlite_repository import SqliteTodoRepository
+
+        return SqliteTodoRepository()
+    raise ValueError(f"Unknown TODO_STORAGE: {name!r}")
@@ -0,0 +1,192 @@
+"""SQLite TodoRepository for local runs and load tests.
+
+Uses WAL mode so readers never block the writer. `id` is the INTEGER
+PRIMARY KEY (the rowid index) and `version` has its own index, so list
+pages and change-feed reads are index range scans. Statements take
+microseconds, so they run inline on the event loop over one shared
+connection guarded by a lock. Every write also deletes expired tombstones
+(what DynamoDB TTL does in production) through a partial index.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator
+
+SQLITE_PATH = os.getenv("TODO_SQLITE_PATH", "todos.db")
+SCAN_PAGE_SIZE = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS todos (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    expires_at INTEGER
+);
+CREATE INDEX IF NOT EXISTS todos_version ON todos (version, id);
+CREATE INDEX IF NOT EXISTS todos_expires ON todos (expires_at)
+    WHERE expires_at IS NOT NULL;
+CREATE TABLE IF NOT EXISTS counter (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO counter (name, value) VALUES ('todo_id', 0);
+"""
+
+_COLUMNS = "id, title, version, deleted, expires_at"
+
+
+def _to_row(record: tuple) -> dict:
+    todo_id, title, version, deleted, expires_at = record
+    row = {"id": todo_id, "title": title, "version": version, "deleted": bool(deleted)}
+    if expires_at is not None:
+        row["expires_at"] = expires_at
+    return row
+
+
+class SqliteTodoRepository:
+    def __init__(self, path: str = SQLITE_PATH) -> None:
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    async def reserve_ids(self, size: int) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE counter SET value = value + ? WHERE name = 'todo_id' "
+                "RETURNING value",
+                (size,),
+            ).fetchone()[0]
+
+    async def list_page(
+        self, limit: int, after_id: int | None
+    ) -> tuple[list[dict], int | None]:
+        with self._lock:
+            records = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM todos WHERE deleted = 0 AND id > ? "
+                "ORDER BY id LIMIT ?",
+                (after_id or 0, limit + 1),
+            ).fetchall()
+        rows = [_to_row(r) for r in records[:limit]]
+        return rows, rows[-1]["id"] if len(records) > limit else None
+
+    async def changes(
+        self, since: int, limit: int, after: tuple[int, int] | None
+    ) -> tuple[list[dict], tuple[int, int] | None]:
+        after = after or (since, -1)
+        with self._lock:
+            records = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM todos WHERE (version, id) > (?, ?) "
+                "ORDER BY version, id LIMIT ?",
+                (*after, limit + 1),
+            ).fetchall()
+        rows = [_to_row(r) for r in records[:limit]]
+        if len(records) <= limit:
+            return rows, None
+        return rows, (rows[-1]["version"], rows[-1]["id"])
+
+    async def head_version(self) -> int:
+        with self._lock:
+            record = self._conn.execute("SELECT MAX(version) FROM todos").fetchone()
+        return record[0] or 0
+
+    async def create(self, row: dict) -> bool:
+        try:
+            with self._lock:
+                self._purge_expired()
+                self._conn.execute(
+                    "INSERT INTO todos (id, title, version) VALUES (?, ?, ?)",
+                    (row["id"], row["title"], row["version"]),
+                )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    async def delete(
+        self, todo_id: int, version: int, expires_at: int
+    ) -> dict | None:
+        with self._lock:
+            self._purge_expired()
+            record = self._conn.execute(
+                "UPDATE todos SET version = ?, deleted = 1, expires_at = ? "
+                f"WHERE id = ? AND deleted = 0 RETURNING {_COLUMNS}",
+                (version, expires_at, todo_id),
+            ).fetchone()
+        return _to_row(record) if record else None
+
+    async def get_many(self, ids: list[int]) -> dict[int, dict]:
+        if not ids:
+            return {}
+        placeholders = ", ".join("?" * len(ids))
+        with self._lock:
+            records = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM todos "
+                f"WHERE deleted = 0 AND id IN ({placeholders})",
+                ids,
+            ).fetchall()
+        return {r[0]: _to_row(r) for r in records}
+
+    async def taken_ids(self, ids: list[int]) -> set[int]:
+        if not ids:
+            return set()
+        placeholders = ", ".join("?" * len(ids))
+        with self._lock:
+            records = self._conn.execute(
+                f"SELECT id FROM todos WHERE id IN ({placeholders})", ids
+            ).fetchall()
+        return {r[0] for r in records}
+
+    async def put_many(self, rows: list[dict]) -> list[dict]:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._purge_expired()
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO todos "
+                    "(id, title, version, deleted, expires_at) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (
+                            row["id"],
+                            row["title"],
+                            row["version"],
+                            int(row.get("deleted", False)),
+                            row.get("expires_at"),
+                        )
+                        for row in rows
+                    ],
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return []
+
+    async def scan(self) -> AsyncIterator[list[dict]]:
+        # Keyset pages, so the lock is never held while the caller consumes.
+        after_id = None
+        while True:
+            rows, after_id = await self.list_page(SCAN_PAGE_SIZE, after_id)
+            if rows:
+                yield rows
+            if after_id is None:
+                return
+
+    async def migrate(self, version: int) -> int:
+        # The schema is created on connect; nothing to backfill.
+        return 0
+
+    async def close(self) -> None:
+        self._conn.close()
+
+    def _purge_expired(self) -> None:
+        """Delete tombstones past `expires_at` (call with the lock held)."""
+        self._conn.execute(
+            "DELETE FROM todos WHERE expires_at IS NOT NULL AND expires_at < ?",
+            (int(time.time()),),
+        )
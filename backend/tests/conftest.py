@@ -0,0 +1,155 @@
+"""
+バックエンドのユニットテスト共通設定 — プロセス内ストレージ (memory) か moto の DynamoDB で動かす
+"""
+
+import os
+
+os.environ.setdefault("TODO_STORAGE", "memory")
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from fastapi.testclient import TestClient
+from moto import mock_aws
+
+import dynamodb_repository
+import main
+
+
+def _empty_page_cache() -> main.PageCache:
+    return main.PageCache(
+        main.CACHE_TTL_SECONDS, main.CACHE_MAX_ENTRIES, main.SYNC_OVERLAP_MS / 1000
+    )
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch):
+    """空のストレージとページキャッシュで動くアプリのクライアント"""
+    monkeypatch.setattr(main, "_repo", None)
+    monkeypatch.setattr(main, "page_cache", _empty_page_cache())
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def settled(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    """書き込みがすべてのインデックスに反映済みとみなす"""
+    monkeypatch.setattr(main, "_is_settled", lambda version: True)
+    monkeypatch.setattr(main.page_cache, "_settle", 0.0)
+
+
+@pytest.fixture
+def dynamodb(monkeypatch: pytest.MonkeyPatch):
+    """moto 上に Terraform と同じ構成で作ったテーブル"""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(dynamodb_repository, "ENDPOINT_URL", None)
+    monkeypatch.setattr(dynamodb_repository, "CLIENT_MODE", "sync")
+    with mock_aws():
+        table = boto3.resource(
+            "dynamodb", region_name=dynamodb_repository.REGION
+        ).create_table(
+            TableName=dynamodb_repository.TABLE_NAME,
+            BillingMode="PAY_PER_REQUEST",
+            KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            AttributeDefinitions=[
+                {"AttributeName": "id", "AttributeType": "N"},
+                {"AttributeName": "list_pk", "AttributeType": "S"},
+                {"AttributeName": "feed_pk", "AttributeType": "S"},
+                {"AttributeName": "version", "AttributeType": "N"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": dynamodb_repository.LIST_INDEX,
+                    "KeySchema": [
+                        {"AttributeName": "list_pk", "KeyType": "HASH"},
+                        {"AttributeName": "id", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {
+                        "ProjectionType": "INCLUDE",
+                        "NonKeyAttributes": ["title", "version"],
+                    },
+                },
+                {
+                    "IndexName": dynamodb_repository.FEED_INDEX,
+                    "KeySchema": [
+                        {"AttributeName": "feed_pk", "KeyType": "HASH"},
+                        {"AttributeName": "version", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {
+                        "ProjectionType": "INCLUDE",
+                        "NonKeyAttributes": ["title", "deleted"],
+                    },
+                },
+            ],
+        )
+        yield table
+
+
+@pytest.fixture
+def dynamo_repo(dynamodb) -> dynamodb_repository.DynamoTodoRepository:
+    """moto のテーブルを使う DynamoDB リポジトリ"""
+    return dynamodb_repository.DynamoTodoRepository()
+
+
+@pytest.fixture
+def dynamodb_client(dynamo_repo, monkeypatch: pytest.MonkeyPatch):
+    """DynamoDB (moto) をストレージにして動くアプリのクライアント"""
+    monkeypatch.setattr(main, "_repo", main._TracedRepository(dynamo_repo))
+    monkeypatch.setattr(
+        main, "id_allocator", main._make_id_allocator(main.ID_ALLOCATOR)
+    )
+    monkeypatch.setattr(main, "page_cache", _empty_page_cache())
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+class DynamoCalls:
+    """リポジトリが送る DynamoDB 呼び出しの記録と、失敗の注入"""
+
+    def __init__(self, call) -> None:
+        self._call = call
+        self.operations: list[str] = []
+        self.batch_sizes: list[int] = []
+        # True を返した行は batch_write_item で書かず UnprocessedItems で返す
+        self.unprocessed = lambda item: False
+        # True を返した id の update_item (削除) はスロットリングで失敗させる
+        self.throttled = lambda todo_id: False
+
+    async def __call__(self, operation: str, **kwargs) -> dict:
+        self.operations.append(operation)
+        if operation == "update_item" and self.throttled(
+            int(kwargs["Key"]["id"]["N"])
+        ):
+            raise ClientError(
+                {"Error": {"Code": "ProvisionedThroughputExceededException"}},
+                "UpdateItem",
+            )
+        if operation != "batch_write_item":
+            return await self._call(operation, **kwargs)
+        ((table, requests),) = kwargs["RequestItems"].items()
+        self.batch_sizes.append(len(requests))
+        skipped = [
+            request
+            for request in requests
+            if self.unprocessed(
+                dynamodb_repository._from_item(request["PutRequest"]["Item"])
+            )
+        ]
+        written = [request for request in requests if request not in skipped]
+        if written:
+            await self._call(operation, RequestItems={table: written})
+        return {"UnprocessedItems": {table: skipped} if skipped else {}}
+
+
+@pytest.fixture
+def dynamo_calls(dynamo_repo, monkeypatch: pytest.MonkeyPatch) -> DynamoCalls:
+    """DynamoDB リポジトリの呼び出しを記録する (再送の待ち時間はなし)"""
+
+    async def no_backoff(attempt: int) -> None:
+        pass
+
+    calls = DynamoCalls(dynamo_repo._client.call)
+    monkeypatch.setattr(dynamo_repo._client, "call", calls)
+    monkeypatch.setattr(dynamodb_repository, "_backoff", no_backoff)
+    return calls
@@ -0,0 +1,74 @@
+"""
+一括作成・一括削除 (DynamoDB, moto) — 行ごとの結果と削除方式の切り替え
+"""
+
+import main
+
+
+def _create(client, titles: list[str]) -> list[int]:
+    response = client.post(
+        "/api/todos:batch", json={"items": [{"title": title} for title in titles]}
+    )
+    return [result["id"] for result in response.json()["results"]]
+
+
+def _titles(client) -> list[str]:
+    return [t["title"] for t in client.get("/api/todos").json()["items"]]
+
+
+def test_書き込めなかった行だけ失敗として返す(dynamodb_client, dynamo_calls):
+    # 準備
+    dynamo_calls.unprocessed = lambda item: item["title"] == "失敗する"
+
+    # 実行
+    response = dynamodb_client.post(
+        "/api/todos:batch",
+        json={"items": [{"title": "買い物"}, {"title": "失敗する"}, {"title": "掃除"}]},
+    )
+
+    # 検証
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == ["created", "failed", "created"]
+    assert _titles(dynamodb_client) == ["買い物", "掃除"]
+
+
+def test_25件以下の削除は1件ずつ条件付きで削除する(dynamodb_client, dynamo_calls):
+    # 準備
+    ids = _create(dynamodb_client, [f"タスク{i}" for i in range(24)])
+    dynamo_calls.throttled = lambda todo_id: todo_id == ids[1]
+    dynamo_calls.operations.clear()
+
+    # 実行
+    response = dynamodb_client.request(
+        "DELETE", "/api/todos:batch", json={"ids": [*ids, 999_999]}
+    )
+
+    # 検証
+    results = response.json()["results"]
+    assert len(results) == main.BATCH_CONDITIONAL_DELETE_MAX
+    assert [r["status"] for r in results[:2]] == ["deleted", "failed"]
+    assert {r["status"] for r in results[2:-1]} == {"deleted"}
+    assert results[-1] == {"id": 999_999, "status": "not_found"}
+    assert set(dynamo_calls.operations) == {"update_item"}
+    assert _titles(dynamodb_client) == ["タスク1"]
+
+
+def test_25件を超える削除は一括取得と一括書き込みで削除する(dynamodb_client, dynamo_calls):
+    # 準備
+    ids = _create(dynamodb_client, [f"タスク{i}" for i in range(30)])
+    dynamo_calls.unprocessed = lambda item: item["id"] == ids[1]
+    dynamo_calls.operations.clear()
+
+    # 実行
+    response = dynamodb_client.request(
+        "DELETE", "/api/todos:batch", json={"ids": [*ids, 999_999]}
+    )
+
+    # 検証
+    results = response.json()["results"]
+    assert [r["status"] for r in results[:2]] == ["deleted", "failed"]
+    assert {r["status"] for r in results[2:-1]} == {"deleted"}
+    assert results[-1] == {"id": 999_999, "status": "not_found"}
+    assert "update_item" not in dynamo_calls.operations
+    assert {"batch_get_item", "batch_write_item"} <= set(dynamo_calls.operations)
+    assert _titles(dynamodb_client) == ["タスク1"]
@@ -0,0 +1,65 @@
+"""
+変更フィード (GET /api/todos?since=) と一覧の version
+"""
+
+import pytest
+
+import main
+
+
+def test_一覧はフィードの先頭バージョンを返す(client):
+    # 準備
+    created = client.post("/api/todos", json={"title": "買い物に行く"}).json()
+
+    # 実行
+    body = client.get("/api/todos").json()
+
+    # 検証
+    assert body["version"] == created["version"]
+
+
+def test_ETagも検証もなければ先頭バージョンを読まない(
+    client, monkeypatch: pytest.MonkeyPatch
+):
+    """TTL のみのキャッシュでは一覧ごとのフィード先頭の Query を省き、version は null"""
+    # 準備
+    monkeypatch.setattr(main, "ETAG_ENABLED", False)
+    monkeypatch.setattr(main, "CACHE_VALIDATE", False)
+    client.post("/api/todos", json={"title": "買い物に行く"})
+    reads = []
+
+    async def head_version() -> int:
+        reads.append(True)
+        return 0
+
+    monkeypatch.setattr(main._repository()._repository, "head_version", head_version)
+
+    # 実行
+    body = client.get("/api/todos").json()
+
+    # 検証
+    assert reads == []
+    assert body["version"] is None
+    assert [t["title"] for t in body["items"]] == ["買い物に行く"]
+
+
+def test_空の一覧のバージョンから同期を始められる(client):
+    """Todo が 1 件もなくても since=0 で変更フィードを読める (410 にならない)"""
+    # 準備
+    since = client.get("/api/todos").json()["version"]
+    created = client.post("/api/todos", json={"title": "買い物に行く"}).json()
+
+    # 実行
+    response = client.get("/api/todos", params={"since": since})
+
+    # 検証
+    assert since == 0
+    assert response.status_code == 200
+    assert response.json()["changes"] == [created]
+    assert response.json()["version"] == created["version"]
+
+
+def test_保持期間より古いバージョンは410を返す(client):
+    response = client.get("/api/todos", params={"since": 1})
+
+    assert response.status_code == 410
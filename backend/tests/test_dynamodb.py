@@ -0,0 +1,87 @@
+"""
+DynamoDB リポジトリ (moto) — 既存データの移行と一括書き込み
+"""
+
+import asyncio
+
+import dynamodb_repository
+import main
+
+
+def _rows(count: int) -> list[dict]:
+    return [
+        main._todo_item(todo_id, f"タスク{todo_id}", todo_id)
+        for todo_id in range(1, count + 1)
+    ]
+
+
+def test_移行前の行は移行後に一覧をページ送りで読める(dynamodb, dynamodb_client):
+    """list_pk / version を持たない旧形式の行がマイグレーションで一覧に載る"""
+    # 準備
+    for todo_id in range(1, 6):
+        dynamodb.put_item(Item={"id": todo_id, "title": f"旧タスク{todo_id}"})
+    before = dynamodb_client.get("/api/todos").json()["items"]
+
+    # 実行
+    backfilled = asyncio.run(main._migrate())
+    titles, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = dynamodb_client.get("/api/todos", params=params).json()
+        titles += [t["title"] for t in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # 検証
+    assert before == []
+    assert backfilled == 5
+    assert titles == [f"旧タスク{todo_id}" for todo_id in range(1, 6)]
+    assert asyncio.run(main._migrate()) == 0
+
+
+def test_一括書き込みは25件ずつに分けて送る(dynamo_repo, dynamo_calls):
+    # 準備
+    rows = _rows(60)
+
+    # 実行
+    failed = asyncio.run(dynamo_repo.put_many(rows))
+
+    # 検証
+    assert failed == []
+    assert dynamo_calls.batch_sizes == [25, 25, 10]
+    assert len(asyncio.run(dynamo_repo.get_many([row["id"] for row in rows]))) == 60
+
+
+def test_未処理で返った行は再送して書き込む(dynamo_repo, dynamo_calls):
+    # 準備
+    pending = {3, 7}
+
+    def unprocessed_once(item: dict) -> bool:
+        if item["id"] not in pending:
+            return False
+        pending.remove(item["id"])
+        return True
+
+    dynamo_calls.unprocessed = unprocessed_once
+
+    # 実行
+    failed = asyncio.run(dynamo_repo.put_many(_rows(10)))
+
+    # 検証
+    assert failed == []
+    assert dynamo_calls.batch_sizes == [10, 2]
+    assert sorted(asyncio.run(dynamo_repo.get_many([3, 7]))) == [3, 7]
+
+
+def test_再送しても残った行は失敗として返す(dynamo_repo, dynamo_calls):
+    # 準備
+    dynamo_calls.unprocessed = lambda item: item["id"] == 3
+
+    # 実行
+    failed = asyncio.run(dynamo_repo.put_many(_rows(5)))
+
+    # 検証
+    assert [row["id"] for row in failed] == [3]
+    assert len(dynamo_calls.batch_sizes) == dynamodb_repository.BATCH_MAX_ATTEMPTS
+    assert sorted(asyncio.run(dynamo_repo.get_many(list(range(1, 6))))) == [1, 2, 4, 5]
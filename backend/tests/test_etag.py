@@ -0,0 +1,52 @@
+"""
+一覧の ETag と 304 Not Modified
+"""
+
+import asyncio
+
+import main
+
+
+def test_同じ一覧には304を返す(client):
+    # 準備
+    client.post("/api/todos", json={"title": "買い物に行く"})
+    etag = client.get("/api/todos").headers["ETag"]
+
+    # 実行
+    response = client.get("/api/todos", headers={"If-None-Match": etag})
+
+    # 検証
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+def test_書き込み後は古いETagで新しい一覧を返す(client):
+    # 準備
+    etag = client.get("/api/todos").headers["ETag"]
+    client.post("/api/todos", json={"title": "買い物に行く"})
+
+    # 実行
+    response = client.get("/api/todos", headers={"If-None-Match": etag})
+
+    # 検証
+    assert response.status_code == 200
+    assert [t["title"] for t in response.json()["items"]] == ["買い物に行く"]
+
+
+def test_先頭バージョンが同じでも中身が変われば新しい一覧を返す(client):
+    """インデックスの遅れや先頭の巻き戻りで、バージョンだけでは変化が分からない場合"""
+    # 準備
+    client.post("/api/todos", json={"title": "買い物に行く"})
+    before = client.get("/api/todos")
+    item = main._todo_item(1, "遅れて見えた行", 1)
+    asyncio.run(main._repository().create(item))
+
+    # 実行
+    response = client.get(
+        "/api/todos", headers={"If-None-Match": before.headers["ETag"]}
+    )
+
+    # 検証
+    assert response.status_code == 200
+    assert response.json()["version"] == before.json()["version"]
+    assert len(response.json()["items"]) == 2
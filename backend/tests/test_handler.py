@@ -0,0 +1,65 @@
+"""
+Lambda ハンドラー — マイグレーションと HTTP イベントの受け付け
+"""
+
+import asyncio
+import json
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def cold_start():
+    """Lambda のコールドスタートと同じく、メインスレッドにイベントループがある状態"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    asyncio.set_event_loop(None)
+    loop.close()
+
+
+def _http_event(method: str, path: str) -> dict:
+    """API Gateway (HTTP API, payload v2) のイベント"""
+    return {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": path,
+        "rawQueryString": "",
+        "headers": {"host": "example.com"},
+        "requestContext": {
+            "accountId": "123456789012",
+            "apiId": "api",
+            "domainName": "example.com",
+            "http": {
+                "method": method,
+                "path": path,
+                "protocol": "HTTP/1.1",
+                "sourceIp": "127.0.0.1",
+                "userAgent": "pytest",
+            },
+            "requestId": "request",
+            "routeKey": "$default",
+            "stage": "$default",
+        },
+        "isBase64Encoded": False,
+    }
+
+
+def test_マイグレーション後もHTTPイベントを処理できる(
+    cold_start, monkeypatch: pytest.MonkeyPatch
+):
+    """同じコンテナで migrate の後に届いた HTTP リクエストがイベントループを失わない"""
+    # 準備
+    monkeypatch.setattr(main, "_repo", None)
+    migrated = main.handler({"action": "migrate"}, None)
+
+    # 実行
+    response = main.handler(_http_event("GET", "/api/todos"), None)
+
+    # 検証
+    assert migrated == {"backfilled": 0}
+    assert response["statusCode"] == 200
+    assert not cold_start.is_closed()
+    assert json.loads(response["body"])["items"] == []
@@ -0,0 +1,80 @@
+"""
+ID の払い出し — ブロックの境界をまたぐ同時作成
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+import main
+from memory_repository import MemoryTodoRepository
+
+
+@pytest.fixture
+def repository(monkeypatch: pytest.MonkeyPatch) -> MemoryTodoRepository:
+    """カウンターの予約が往復の途中で他のリクエストに譲る memory リポジトリ"""
+    repository = MemoryTodoRepository()
+    reserve_ids = repository.reserve_ids
+
+    async def slow_reserve_ids(size: int) -> int:
+        await asyncio.sleep(0)
+        return await reserve_ids(size)
+
+    monkeypatch.setattr(repository, "reserve_ids", slow_reserve_ids)
+    monkeypatch.setattr(main, "_repo", main._TracedRepository(repository))
+    return repository
+
+
+def test_同時に払い出してもブロックをまたいでIDが重複しない(repository):
+    # 準備
+    allocator = main.BlockIdAllocator(3)
+
+    async def allocate_all() -> list[list[int]]:
+        return await asyncio.gather(
+            *(allocator.allocate(1 + i % 4) for i in range(20))
+        )
+
+    # 実行
+    batches = asyncio.run(allocate_all())
+
+    # 検証
+    ids = [todo_id for batch in batches for todo_id in batch]
+    assert [len(batch) for batch in batches] == [1 + i % 4 for i in range(20)]
+    assert len(set(ids)) == len(ids)
+
+
+def test_同時に作成してもブロックを使い切った後のIDが重複しない(
+    repository, monkeypatch: pytest.MonkeyPatch
+):
+    # 準備
+    monkeypatch.setattr(main, "id_allocator", main.BlockIdAllocator(3))
+    monkeypatch.setattr(
+        main,
+        "page_cache",
+        main.PageCache(
+            main.CACHE_TTL_SECONDS, main.CACHE_MAX_ENTRIES, main.SYNC_OVERLAP_MS / 1000
+        ),
+    )
+
+    async def create_all() -> tuple[list[httpx.Response], httpx.Response]:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            created = await asyncio.gather(
+                *(
+                    client.post("/api/todos", json={"title": f"タスク{i}"})
+                    for i in range(10)
+                )
+            )
+            return created, await client.get("/api/todos")
+
+    # 実行
+    created, listed = asyncio.run(create_all())
+
+    # 検証
+    ids = [response.json()["id"] for response in created]
+    assert {response.status_code for response in created} == {201}
+    assert len(set(ids)) == 10
+    assert sorted(t["id"] for t in listed.json()["items"]) == sorted(ids)
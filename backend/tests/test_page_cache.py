@@ -0,0 +1,187 @@
+"""
+一覧ページキャッシュ (PageCache) のヒット・ミス・無効化
+"""
+
+import asyncio
+
+import pytest
+
+import main
+from main import PageCache
+
+
+def _page(*ids: int, next_cursor: str | None = None) -> dict:
+    return {
+        "items": [{"id": i, "title": f"todo {i}", "version": i} for i in ids],
+        "next_cursor": next_cursor,
+    }
+
+
+# ---------------------------------------------------------------------------
+# PageCache 単体
+# ---------------------------------------------------------------------------
+
+
+def test_同じキーとバージョンならキャッシュから返す():
+    """put したページを同じバージョンで get するとヒットする"""
+    cache = PageCache(ttl=60, max_entries=8)
+    cache.put((10, None), 0, None, _page(1, 2), version=5)
+
+    assert cache.get((10, None), version=5) == _page(1, 2)
+    assert cache.stats()["hits"] == 1
+
+
+def test_バージョンが変わると取り直す():
+    """フィードの先頭バージョンが進んだらミスになり、ページを捨てる"""
+    cache = PageCache(ttl=60, max_entries=8)
+    cache.put((10, None), 0, None, _page(1), version=5)
+
+    assert cache.get((10, None), version=6) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_TTLを過ぎると取り直す():
+    """期限切れのページはミスになる"""
+    cache = PageCache(ttl=-1, max_entries=8)
+    cache.put((10, None), 0, None, _page(1))
+
+    assert cache.get((10, None)) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_上限を超えると最後に使われたのが古いページから捨てる():
+    """LRU: 参照したページは残り、参照していないページが捨てられる"""
+    cache = PageCache(ttl=60, max_entries=2)
+    cache.put((10, None), 0, None, _page(1))
+    cache.put((10, "a"), 1, None, _page(2))
+    cache.get((10, None))
+
+    cache.put((10, "b"), 2, None, _page(3))
+
+    assert cache.get((10, "a")) is None
+    assert cache.get((10, None)) == _page(1)
+
+
+def test_作成したTodoは範囲が合うページに差し込む():
+    """ID の範囲が合うページにだけ、ID 順に差し込む"""
+    cache = PageCache(ttl=60, max_entries=8)
+    cache.put((10, None), 0, 5, _page(1, 4))
+    cache.put((10, "a"), 5, None, _page(6))
+
+    cache.apply_create({"id": 3, "title": "todo 3", "version": 3})
+
+    assert cache.get((10, None)) == _page(1, 3, 4)
+    assert cache.get((10, "a")) == _page(6)
+
+
+def test_満杯のページに作成が入るとページを捨てる():
+    """差し込むと limit を超えるページは捨てる"""
+    cache = PageCache(ttl=60, max_entries=8)
+    cache.put((2, None), 0, None, _page(1, 2))
+
+    cache.apply_create({"id": 3, "title": "todo 3", "version": 3})
+
+    assert cache.get((2, None)) is None
+
+
+def test_削除したTodoはページから除く():
+    cache = PageCache(ttl=60, max_entries=8)
+    cache.put((10, None), 0, None, _page(1, 2, 3))
+
+    cache.apply_delete({2})
+
+    assert cache.get((10, None)) == _page(1, 3)
+
+
+def test_書き込み直後に読んだページはキャッシュしない():
+    """インデックスに反映される前に読んだかもしれないページは保存しない"""
+    cache = PageCache(ttl=60, max_entries=8, settle=60)
+    cache.apply_delete({1})
+
+    cache.put((10, None), 0, None, _page(2))
+
+    assert cache.get((10, None)) is None
+
+
+# ---------------------------------------------------------------------------
+# GET /api/todos (memory ストレージ)
+# ---------------------------------------------------------------------------
+
+
+def test_一覧の2回目はキャッシュから返る(client, settled):
+    # 準備
+    client.post("/api/todos", json={"title": "買い物に行く"})
+
+    # 実行
+    first = client.get("/api/todos")
+    second = client.get("/api/todos")
+
+    # 検証
+    assert first.headers["X-Cache"] == "miss"
+    assert second.headers["X-Cache"] == "hit"
+    assert second.json() == first.json()
+
+
+def test_書き込み直後の一覧はキャッシュしない(client):
+    """フィードの先頭がまだ新しいうちは、読んだページを保存しない"""
+    # 準備
+    client.post("/api/todos", json={"title": "買い物に行く"})
+
+    # 実行
+    client.get("/api/todos")
+    response = client.get("/api/todos")
+
+    # 検証
+    assert response.headers["X-Cache"] == "miss"
+    assert [t["title"] for t in response.json()["items"]] == ["買い物に行く"]
+
+
+def test_他のコンテナの書き込みでバージョンが進むと取り直す(client, settled):
+    """ページキャッシュを通らない書き込みも、フィードの先頭の比較で気づく"""
+    # 準備
+    client.get("/api/todos")
+    item = main._todo_item(1, "別コンテナ", main._next_version())
+    asyncio.run(main._repository().create(item))
+
+    # 実行
+    response = client.get("/api/todos")
+
+    # 検証
+    assert response.headers["X-Cache"] == "miss"
+    assert [t["title"] for t in response.json()["items"]] == ["別コンテナ"]
+
+
+@pytest.fixture
+def ttl_only(client, monkeypatch: pytest.MonkeyPatch):
+    """ETag も先頭バージョンの比較もなく、TTL だけで失効させる"""
+    monkeypatch.setattr(main, "ETAG_ENABLED", False)
+    monkeypatch.setattr(main, "CACHE_VALIDATE", False)
+
+
+def test_TTLのみなら作成したTodoをキャッシュ済みのページに差し込んで返す(client, settled, ttl_only):
+    # 準備
+    client.post("/api/todos", json={"title": "買い物に行く"})
+    client.get("/api/todos")
+
+    # 実行
+    client.post("/api/todos", json={"title": "掃除する"})
+    response = client.get("/api/todos")
+
+    # 検証
+    assert response.headers["X-Cache"] == "hit"
+    assert [t["title"] for t in response.json()["items"]] == ["買い物に行く", "掃除する"]
+
+
+def test_TTLのみなら削除したTodoをキャッシュ済みのページから除いて返す(client, settled, ttl_only):
+    # 準備
+    for title in ("買い物に行く", "掃除する"):
+        client.post("/api/todos", json={"title": title})
+    todo_id = client.get("/api/todos").json()["items"][0]["id"]
+
+    # 実行
+    client.delete(f"/api/todos/{todo_id}")
+    response = client.get("/api/todos")
+
+    # 検証
+    assert response.headers["X-Cache"] == "hit"
+    assert [t["title"] for t in response.json()["items"]] == ["掃除する"]
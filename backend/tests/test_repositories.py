@@ -0,0 +1,81 @@
+"""
+ローカル用ストレージ (memory / sqlite) の書き込みと墓標の期限切れ
+"""
+
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from memory_repository import MemoryTodoRepository
+from sqlite_repository import SqliteTodoRepository
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def repository(request, tmp_path):
+    if request.param == "memory":
+        repo = MemoryTodoRepository()
+    else:
+        repo = SqliteTodoRepository(str(tmp_path / "todos.db"))
+    yield repo
+    asyncio.run(repo.close())
+
+
+def _tombstone(todo_id: int, version: int, expires_at: int) -> dict:
+    return {
+        "id": todo_id,
+        "title": f"todo {todo_id}",
+        "version": version,
+        "deleted": True,
+        "expires_at": expires_at,
+    }
+
+
+def test_期限切れの墓標は次の書き込みで消える(repository):
+    """TTL を過ぎた墓標は変更フィードからも ID の使用済み判定からも消える"""
+    # 準備
+    now = int(time.time())
+    asyncio.run(
+        repository.put_many(
+            [_tombstone(1, 10, now - 1), _tombstone(2, 20, now + 3600)]
+        )
+    )
+
+    # 実行
+    asyncio.run(repository.create({"id": 3, "title": "todo 3", "version": 30}))
+
+    # 検証
+    rows, _ = asyncio.run(repository.changes(0, 10, None))
+    assert [row["id"] for row in rows] == [2, 3]
+    assert asyncio.run(repository.taken_ids([1, 2, 3])) == {2, 3}
+
+
+def test_削除した墓標は期限まで変更フィードに残る(repository):
+    # 準備
+    asyncio.run(repository.create({"id": 1, "title": "todo 1", "version": 10}))
+
+    # 実行
+    asyncio.run(repository.delete(1, 20, int(time.time()) + 3600))
+    asyncio.run(repository.create({"id": 2, "title": "todo 2", "version": 30}))
+
+    # 検証
+    rows, _ = asyncio.run(repository.changes(0, 10, None))
+    assert [(row["id"], row["deleted"]) for row in rows] == [(1, True), (2, False)]
+
+
+def test_sqliteのput_manyが失敗してもトランザクションを残さない(tmp_path):
+    """失敗した一括書き込みはロールバックされ、次の書き込みは成功する"""
+    # 準備
+    repo = SqliteTodoRepository(str(tmp_path / "todos.db"))
+    broken = {"id": 1, "title": None, "version": 10}
+
+    # 実行
+    with pytest.raises(sqlite3.IntegrityError):
+        asyncio.run(repo.put_many([broken]))
+    asyncio.run(repo.put_many([{"id": 2, "title": "todo 2", "version": 20}]))
+
+    # 検証
+    rows, _ = asyncio.run(repo.list_page(10, None))
+    assert [row["id"] for row in rows] == [2]
+    asyncio.run(repo.close())
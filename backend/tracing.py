@@ -0,0 +1,128 @@
+"""Per-request tracing shared by the app and the storage engines.
+
+A sampled request carries a Trace in a context variable. Code on the hot
+path records into it with `span(phase)` and storage engines count their
+round trips with `record_call`; unsampled requests skip all of it after
+one context-variable lookup.
+"""
+
+import contextvars
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+
+# Fraction of requests to trace (0 disables tracing, 1 traces everything).
+TRACE_SAMPLE_RATE = float(os.getenv("TODO_TRACE_SAMPLE_RATE", "0.01"))
+METRICS_NAMESPACE = os.getenv("TODO_METRICS_NAMESPACE", "SampleAgentitest/TodoApi")
+
+_current: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar(
+    "trace", default=None
+)
+
+
+class Trace:
+    """Phase timings (ms) and storage round trips for one request."""
+
+    def __init__(self, started: float) -> None:
+        self.started = started
+        self.phases: dict[str, float] = {}
+        # perf_counter() timestamps for phases that end in another component.
+        self.marks: dict[str, float] = {}
+        self.db_calls = 0
+        self.consumed_capacity = 0.0
+        self.route: str | None = None
+        self.status: int | None = None
+        self._open: set[str] = set()
+        self._token: contextvars.Token | None = None
+
+    def add(self, phase: str, started: float) -> None:
+        """Add the time since `started` to `phase`."""
+        elapsed = (time.perf_counter() - started) * 1000
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed
+
+    def record_call(self, consumed: dict | list | None = None) -> None:
+        """Count one storage round trip and the capacity it reported."""
+        self.db_calls += 1
+        if isinstance(consumed, dict):
+            consumed = [consumed]
+        for entry in consumed or ():
+            self.consumed_capacity += entry.get("CapacityUnits", 0.0)
+
+    def server_timing(self) -> str:
+        """Render the phases recorded so far as a Server-Timing value."""
+        metrics = []
+        for phase, ms in self.phases.items():
+            metric = f"{phase};dur={ms:.2f}"
+            if phase == "db" and self.db_calls:
+                metric += f';desc="{self.db_calls} calls, {self.consumed_capacity:g} CU"'
+            metrics.append(metric)
+        return ", ".join(metrics)
+
+    def emit(self) -> None:
+        """Log the trace as one CloudWatch Embedded Metric Format line."""
+        metrics = {f"{phase}_ms": round(ms, 3) for phase, ms in self.phases.items()}
+        metrics["db_calls"] = self.db_calls
+        metrics["consumed_capacity"] = self.consumed_capacity
+        units = {"db_calls": "Count", "consumed_capacity": "None"}
+        print(
+            json.dumps(
+                {
+                    "_aws": {
+                        "Timestamp": int(time.time() * 1000),
+                        "CloudWatchMetrics": [
+                            {
+                                "Namespace": METRICS_NAMESPACE,
+                                "Dimensions": [["route"]],
+                                "Metrics": [
+                                    {"Name": name, "Unit": units.get(name, "Milliseconds")}
+                                    for name in metrics
+                                ],
+                            }
+                        ],
+                    },
+                    "route": self.route or "unmatched",
+                    "status": self.status,
+                    "sample_rate": TRACE_SAMPLE_RATE,
+                    **metrics,
+                }
+            )
+        )
+
+
+def start(started: float | None = None) -> Trace | None:
+    """Make the sampling decision and, if sampled, open a trace."""
+    if TRACE_SAMPLE_RATE <= 0 or random.random() >= TRACE_SAMPLE_RATE:
+        return None
+    trace = Trace(time.perf_counter() if started is None else started)
+    trace._token = _current.set(trace)
+    return trace
+
+
+def end(trace: Trace) -> None:
+    """Detach `trace` from the current context."""
+    if trace._token is not None:
+        _current.reset(trace._token)
+        trace._token = None
+
+
+def current() -> Trace | None:
+    return _current.get()
+
+
+@contextmanager
+def span(phase: str):
+    """Time the enclosed block into `phase`; nested spans of the same phase
+    count once."""
+    trace = _current.get()
+    if trace is None or phase in trace._open:
+        yield
+        return
+    trace._open.add(phase)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace._open.discard(phase)
+        trace.add(phase, started)
@@ -1,10 +1,13 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useAuth } from "../auth/AuthContext";
-
-type Todo = {
-  id: number;
-  title: string;
-};
+import {
+  applyChanges,
+  loadChanges,
+  loadList,
+  type SyncResult,
+  type Todo,
+  type TodoChange,
+} from "./todoSync";
 
 const API_URL = `${import.meta.env.VITE_API_URL ?? ""}/api/todos`;
 
@@ -12,6 +15,8 @@ function TodoPage() {
   const { auth } = useAuth();
   const [todos, setTodos] = useState<Todo[]>([]);
   const [title, setTitle] = useState("");
+  // Feed version the list is synced up to; null until the list is loaded.
+  const version = useRef<number | null>(null);
 
   const headers = (): Record<string, string> => {
     const h: Record<string, string> = { "Content-Type": "application/json" };
@@ -21,30 +26,61 @@ function TodoPage() {
     return h;
   };
 
-  const fetchTodos = async () => {
-    const res = await fetch(API_URL, { headers: headers() });
-    setTodos(await res.json());
+  const get = (params: URLSearchParams) => {
+    const query = String(params);
+    return fetch(query ? `${API_URL}?${query}` : API_URL, {
+      headers: headers(),
+    });
+  };
+
+  // Only list and feed responses move the version; local writes below just
+  // update the shown list, and the next sync re-reads them from the feed.
+  const update = async (next: Promise<SyncResult>) => {
+    const { version: latest, apply } = await next;
+    version.current = latest;
+    setTodos(apply);
+  };
+
+  const fetchTodos = () => update(loadList(get));
+
+  const syncTodos = () => update(loadChanges(version.current, get));
+
+  const applyChange = (change: TodoChange) => {
+    setTodos((prev) => applyChanges(prev, [change]));
   };
 
   useEffect(() => {
     fetchTodos();
+    window.addEventListener("focus", syncTodos);
+    return () => window.removeEventListener("focus", syncTodos);
   }, []);
 
   const addTodo = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!title.trim()) return;
-    await fetch(API_URL, {
+    const res = await fetch(API_URL, {
       method: "POST",
       headers: headers(),
       body: JSON.stringify({ title }),
     });
     setTitle("");
-    fetchTodos();
+    if (res.ok) {
+      applyChange(await res.json());
+    } else {
+      syncTodos();
+    }
   };
 
   const deleteTodo = async (id: number) => {
-    await fetch(`${API_URL}/${id}`, { method: "DELETE", headers: headers() });
-    fetchTodos();
+    const res = await fetch(`${API_URL}/${id}`, {
+      method: "DELETE",
+      headers: headers(),
+    });
+    if (res.ok) {
+      applyChange(await res.json());
+    } else {
+      syncTodos();
+    }
   };
 
   return (
@@ -0,0 +1,140 @@
+/**
+ * 一覧と変更フィードによる Todo の同期
+ */
+import assert from "node:assert/strict";
+import { test } from "node:test";
+
+import {
+  applyChanges,
+  loadChanges,
+  loadList,
+  type Get,
+  type Todo,
+} from "./todoSync.ts";
+
+// クエリ文字列ごとに決まった応答を返す GET と、呼ばれたクエリの記録
+const fakeGet = (responses: Record<string, [number, unknown]>) => {
+  const queries: string[] = [];
+  const get: Get = async (params) => {
+    const query = String(params);
+    queries.push(query);
+    const [status, body] = responses[query];
+    return new Response(JSON.stringify(body), { status });
+  };
+  return { get, queries };
+};
+
+const todo = (id: number, version: number): Todo => ({
+  id,
+  title: `todo ${id}`,
+  version,
+});
+
+test("変更は id 順の一覧に反映され、削除は取り除かれる", () => {
+  // 準備
+  const todos = [todo(1, 1), todo(3, 3)];
+
+  // 実行
+  const result = applyChanges(todos, [
+    { ...todo(2, 4), deleted: false },
+    { ...todo(3, 5), deleted: true },
+  ]);
+
+  // 検証
+  assert.deepEqual(result, [todo(1, 1), todo(2, 4)]);
+});
+
+test("一覧は全ページを読み、先頭ページのバージョンから同期する", async () => {
+  // 準備
+  const { get } = fakeGet({
+    "": [200, { items: [todo(1, 1)], next_cursor: "c1", version: 7 }],
+    "cursor=c1": [200, { items: [todo(2, 2)], next_cursor: null, version: 9 }],
+  });
+
+  // 実行
+  const result = await loadList(get);
+
+  // 検証
+  assert.equal(result.version, 7);
+  assert.deepEqual(result.apply([todo(5, 5)]), [todo(1, 1), todo(2, 2)]);
+});
+
+test("一覧にバージョンがなければ読んだ中で最も新しい行から同期する", async () => {
+  // 準備
+  const { get } = fakeGet({
+    "": [200, { items: [todo(1, 5)], next_cursor: "c1", version: null }],
+    "cursor=c1": [
+      200,
+      { items: [todo(2, 3)], next_cursor: null, version: null },
+    ],
+  });
+
+  // 実行
+  const result = await loadList(get);
+
+  // 検証
+  assert.equal(result.version, 5);
+});
+
+test("フィードの全ページの変更を今の一覧に重ね、最後のバージョンまで進める", async () => {
+  // 準備
+  const { get, queries } = fakeGet({
+    "since=7": [
+      200,
+      {
+        changes: [{ ...todo(2, 8), deleted: false }],
+        version: 9,
+        next_cursor: "c1",
+      },
+    ],
+    "since=7&cursor=c1": [
+      200,
+      {
+        changes: [{ ...todo(1, 9), deleted: true }],
+        version: 10,
+        next_cursor: null,
+      },
+    ],
+  });
+
+  // 実行
+  const result = await loadChanges(7, get);
+
+  // 検証
+  assert.deepEqual(queries, ["since=7", "since=7&cursor=c1"]);
+  assert.equal(result.version, 10);
+  assert.deepEqual(result.apply([todo(1, 1), todo(3, 3)]), [
+    todo(2, 8),
+    todo(3, 3),
+  ]);
+});
+
+test("フィードが残っていなければ (410) 一覧を読み直す", async () => {
+  // 準備
+  const { get, queries } = fakeGet({
+    "since=7": [410, { detail: "gone" }],
+    "": [200, { items: [todo(4, 20)], next_cursor: null, version: 21 }],
+  });
+
+  // 実行
+  const result = await loadChanges(7, get);
+
+  // 検証
+  assert.deepEqual(queries, ["since=7", ""]);
+  assert.equal(result.version, 21);
+  assert.deepEqual(result.apply([todo(1, 1)]), [todo(4, 20)]);
+});
+
+test("一覧をまだ読んでいなければフィードではなく一覧を読む", async () => {
+  // 準備
+  const { get, queries } = fakeGet({
+    "": [200, { items: [], next_cursor: null, version: 3 }],
+  });
+
+  // 実行
+  const result = await loadChanges(null, get);
+
+  // 検証
+  assert.deepEqual(queries, [""]);
+  assert.equal(result.version, 3);
+});
@@ -0,0 +1,90 @@
+export type Todo = {
+  id: number;
+  title: string;
+  version: number;
+};
+
+export type TodoChange = Todo & {
+  deleted: boolean;
+};
+
+export type TodoListResponse = {
+  items: Todo[];
+  next_cursor: string | null;
+  // Null when the server runs without ETags or cache validation.
+  version: number | null;
+};
+
+export type TodoChangesResponse = {
+  changes: TodoChange[];
+  version: number;
+  next_cursor: string | null;
+};
+
+// GET /api/todos with the given query string.
+export type Get = (params: URLSearchParams) => Promise<Response>;
+
+// Feed version to sync from next, and how to bring the shown list up to it.
+// `apply` is a state updater so changes made meanwhile are not lost.
+export type SyncResult = {
+  version: number;
+  apply: (todos: Todo[]) => Todo[];
+};
+
+export const applyChanges = (todos: Todo[], changes: TodoChange[]): Todo[] => {
+  const byId = new Map(todos.map((todo) => [todo.id, todo]));
+  for (const { deleted, ...todo } of changes) {
+    if (deleted) {
+      byId.delete(todo.id);
+    } else {
+      byId.set(todo.id, todo);
+    }
+  }
+  return [...byId.values()].sort((a, b) => a.id - b.id);
+};
+
+// Reads every page of the list. The version comes from the first page,
+// which the server reads before the rows, so no later change is skipped.
+// Without one, sync starts from the newest row read: starting early only
+// re-sends changes the list already shows.
+export const loadList = async (get: Get): Promise<SyncResult> => {
+  const all: Todo[] = [];
+  let cursor: string | null = null;
+  let version: number | null | undefined;
+  do {
+    const params = new URLSearchParams();
+    if (cursor) params.set("cursor", cursor);
+    const body: TodoListResponse = await (await get(params)).json();
+    all.push(...body.items);
+    if (version === undefined) version = body.version;
+    cursor = body.next_cursor;
+  } while (cursor);
+  return {
+    version:
+      version ?? all.reduce((max, todo) => Math.max(max, todo.version), 0),
+    apply: () => all,
+  };
+};
+
+// Reads the feed since `since`; reloads the list when there is nothing to
+// sync from yet or the server no longer keeps that part of the feed (410).
+export const loadChanges = async (
+  since: number | null,
+  get: Get,
+): Promise<SyncResult> => {
+  if (since === null) return loadList(get);
+  const changes: TodoChange[] = [];
+  let cursor: string | null = null;
+  let version = since;
+  do {
+    const params = new URLSearchParams({ since: String(since) });
+    if (cursor) params.set("cursor", cursor);
+    const res = await get(params);
+    if (res.status === 410) return loadList(get);
+    const body: TodoChangesResponse = await res.json();
+    changes.push(...body.changes);
+    version = body.version;
+    cursor = body.next_cursor;
+  } while (cursor);
+  return { version, apply: (todos) => applyChanges(todos, changes) };
+};
@@ -7,4 +7,44 @@ resource "aws_dynamodb_table" "todos" {
     name = "id"
     type = "N"
   }
+
+  attribute {
+    name = "list_pk"
+    type = "S"
+  }
+
+  attribute {
+    name = "feed_pk"
+    type = "S"
+  }
+
+  attribute {
+    name = "version"
+    type = "N"
+  }
+
+  # Sparse index: only live todos carry list_pk, so the counter item and
+  # tombstones are excluded and GET /api/todos can Query pages sorted by id.
+  global_secondary_index {
+    name               = "by_id"
+    hash_key           = "list_pk"
+    range_key          = "id"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["title", "version"]
+  }
+
+  # Change feed for GET /api/todos?since=<version>, including tombstones.
+  global_secondary_index {
+    name               = "by_version"
+    hash_key           = "feed_pk"
+    range_key          = "version"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["title", "deleted"]
+  }
+
+  # Expires delete tombstones after TODO_TOMBSTONE_TTL_SECONDS.
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
 }
@@ -28,8 +28,14 @@ resource "aws_iam_role_policy" "lambda_dynamodb" {
         "dynamodb:UpdateItem",
         "dynamodb:DeleteItem",
         "dynamodb:Scan",
+        "dynamodb:Query",
+        "dynamodb:BatchGetItem",
+        "dynamodb:BatchWriteItem",
+      ]
+      Resource = [
+        aws_dynamodb_table.todos.arn,
+        "${aws_dynamodb_table.todos.arn}/index/*",
       ]
-      Resource = aws_dynamodb_table.todos.arn
     }]
   })
 }
@@ -67,3 +73,15 @@ resource "aws_lambda_permission" "apigw" {
   principal     = "apigateway.amazonaws.com"
   source_arn    = "${aws_apigatewayv2_api.main.execution_arn}/*/*"
 }
+
+# Create the counter item and backfill rows that predate the list/feed
+# indexes (rows without list_pk/feed_pk are invisible to GET /api/todos).
+# Runs again whenever the code changes; the migration is idempotent.
+resource "aws_lambda_invocation" "migrate" {
+  function_name = aws_lambda_function.api.function_name
+  input         = jsonencode({ action = "migrate" })
+
+  triggers = {
+    source_code_hash = aws_lambda_function.api.source_code_hash
+  }
+}
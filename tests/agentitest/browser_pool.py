@@ -0,0 +1,213 @@
+"""
+ブラウザプール — ワーカーごとに Chromium を起動したまま使い回す
+
+テストごとに Chromium を起動・終了する代わりに、最初に借りられたときに
+起動したブラウザへ各テストの BrowserSession を CDP (cdp_url) で接続する。
+貸し出し時にはタブを新しい about:blank 1 枚にし、Cookie とテスト対象オリジンの
+ストレージ (localStorage・IndexedDB・キャッシュ) を消して前のテストの状態を
+持ち越さない。
+
+browser_use はブラウザ内のすべてのタブを操作対象にするため、並行実行する
+タスクには同じブラウザのコンテキストではなく別々のブラウザを割り当てる
+(`size` 個まで起動する)。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlparse
+
+from cdp_use import CDPClient
+
+LAUNCH_TIMEOUT = 30.0  # 秒
+_SEED_FLAG = "__agentitest_seeded"
+_COOKIE_FIELDS = (
+    "name",
+    "value",
+    "domain",
+    "path",
+    "expires",
+    "httpOnly",
+    "secure",
+    "sameSite",
+)
+
+
+class BrowserPool:
+    """ワーカー内のテストで共有する、最大 `size` 個の Chromium"""
+
+    def __init__(
+        self, executable: str, base_url: str, headless: bool = True, size: int = 1
+    ) -> None:
+        url = urlparse(base_url)
+        origin = f"{url.scheme}://{url.netloc}"
+        self._browsers = [
+            _PooledBrowser(executable, origin, headless) for _ in range(size)
+        ]
+        self._idle: asyncio.LifoQueue[_PooledBrowser] | None = None
+
+    @property
+    def browser_version(self) -> str | None:
+        """起動済みのブラウザのバージョン (例: "HeadlessChrome/140.0.7339.16")"""
+        versions = (b.browser_version for b in self._browsers if b.browser_version)
+        return next(versions, None)
+
+    @asynccontextmanager
+    async def lease(
+        self, storage_state: dict[str, Any] | None = None
+    ) -> AsyncIterator[tuple[str, bool]]:
+        """空いているブラウザを初期状態に戻して貸し出す
+
+        `storage_state` (Playwright 形式) を渡すと、その Cookie と localStorage を
+        読み込んだ状態にする。値は (cdp_url, このリースで起動したか)。
+        起動済みのブラウザを優先して使い回す。
+        """
+        if self._idle is None:
+            self._idle = asyncio.LifoQueue()
+            for browser in reversed(self._browsers):
+                self._idle.put_nowait(browser)
+        browser = await self._idle.get()
+        try:
+            async with browser.lease(storage_state) as launched:
+                yield browser.cdp_url, launched
+        finally:
+            self._idle.put_nowait(browser)
+
+    def close(self) -> None:
+        for browser in self._browsers:
+            browser.close()
+
+
+class _PooledBrowser:
+    """プール内の Chromium プロセス 1 つ"""
+
+    def __init__(self, executable: str, origin: str, headless: bool) -> None:
+        self._origin = origin
+        self._executable = executable
+        self._headless = headless
+        self._process: subprocess.Popen | None = None
+        self._user_data_dir: str | None = None
+        self._port: int | None = None
+        self._ws_path: str | None = None
+        self.browser_version: str | None = None
+
+    @property
+    def cdp_url(self) -> str:
+        return f"http://127.0.0.1:{self._port}"
+
+    @asynccontextmanager
+    async def lease(
+        self, storage_state: dict[str, Any] | None = None
+    ) -> AsyncIterator[bool]:
+        """初期状態に戻して貸し出す。値はこのリースで起動したなら True"""
+        launched = self._process is None or self._process.poll() is not None
+        if launched:
+            await asyncio.to_thread(self._launch)
+        async with CDPClient(f"ws://127.0.0.1:{self._port}{self._ws_path}") as cdp:
+            if launched:
+                self.browser_version = (await cdp.send.Browser.getVersion())["product"]
+            target_id = await self._reset(cdp)
+            if storage_state:
+                # 追加したスクリプトは接続中だけ有効なので、テストの間は接続を保つ
+                await self._seed(cdp, target_id, storage_state)
+            yield launched
+
+    def close(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+            self._process = None
+        if self._user_data_dir is not None:
+            shutil.rmtree(self._user_data_dir, ignore_errors=True)
+            self._user_data_dir = None
+
+    # -- 内部処理 -------------------------------------------------------------
+
+    def _launch(self) -> None:
+        self.close()
+        self._user_data_dir = tempfile.mkdtemp(prefix="agentitest-browser-")
+        args = [
+            self._executable,
+            "--remote-debugging-port=0",
+            f"--user-data-dir={self._user_data_dir}",
+            "--no-first-run",
+            "--no-default-browser-check",
+            "--window-size=1280,1100",
+        ]
+        if self._headless:
+            args.append("--headless=new")
+        self._process = subprocess.Popen(
+            [*args, "about:blank"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        # Chromium は待ち受けポートと接続パスを DevToolsActivePort に書き出す
+        port_file = Path(self._user_data_dir) / "DevToolsActivePort"
+        deadline = time.monotonic() + LAUNCH_TIMEOUT
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError(f"Chromium exited with {self._process.returncode}")
+            lines = port_file.read_text().split() if port_file.exists() else []
+            if len(lines) == 2:
+                self._port, self._ws_path = int(lines[0]), lines[1]
+                return
+            time.sleep(0.05)
+        self.close()
+        raise RuntimeError("Chromium did not open a DevTools port in time")
+
+    async def _reset(self, cdp: CDPClient) -> str:
+        """Cookie とオリジンのストレージを消し、タブを about:blank 1 枚にする"""
+        await cdp.send.Storage.clearCookies()
+        await cdp.send.Storage.clearDataForOrigin(
+            params={"origin": self._origin, "storageTypes": "all"}
+        )
+        targets = (await cdp.send.Target.getTargets())["targetInfos"]
+        created = await cdp.send.Target.createTarget(params={"url": "about:blank"})
+        for target in targets:
+            if target["type"] == "page":
+                await cdp.send.Target.closeTarget(
+                    params={"targetId": target["targetId"]}
+                )
+        return created["targetId"]
+
+    async def _seed(
+        self, cdp: CDPClient, target_id: str, storage_state: dict[str, Any]
+    ) -> None:
+        """storage_state の Cookie を設定し、localStorage をページ読み込み時に注入する"""
+        cookies = [
+            {k: c[k] for k in _COOKIE_FIELDS if k in c}
+            for c in storage_state.get("cookies", [])
+        ]
+        if cookies:
+            await cdp.send.Storage.setCookies(params={"cookies": cookies})
+        items = {
+            origin["origin"]: {i["name"]: i["value"] for i in origin["localStorage"]}
+            for origin in storage_state.get("origins", [])
+        }
+        if not items:
+            return
+        # サインアウト後の再読み込みで復活しないよう、タブごとに 1 回だけ注入する
+        source = f"""(() => {{
+  const items = {json.dumps(items)}[location.origin];
+  if (!items || sessionStorage.getItem("{_SEED_FLAG}")) return;
+  for (const [key, value] of Object.entries(items)) localStorage.setItem(key, value);
+  sessionStorage.setItem("{_SEED_FLAG}", "1");
+}})();"""
+        attached = await cdp.send.Target.attachToTarget(
+            params={"targetId": target_id, "flatten": True}
+        )
+        await cdp.send.Page.addScriptToEvaluateOnNewDocument(
+            params={"source": source}, session_id=attached["sessionId"]
+        )
@@ -8,16 +8,17 @@ UIの振る舞いを検証する。従来のPlaywrightテストとの比較用
 from __future__ import annotations
 
 import asyncio
-import base64
-import binascii
+import json
 import logging
 import os
 import sys
-from importlib.metadata import version
+import time
+from collections import defaultdict
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
 import allure
-import boto3
 import pytest
 from browser_use import (
     Agent,
@@ -25,11 +26,20 @@ from browser_use import (
     BrowserSession,
     ChatGoogle,
 )
+from browser_use.agent.views import AgentHistory, AgentHistoryList
 from dotenv import load_dotenv
 from playwright.sync_api import sync_playwright
 
+from ..auth import fetch_storage_state
+from ..cleanup import TodoCleaner
+from .browser_pool import BrowserPool
+from .llm_cache import CachingChatModel, LLMCall, ResponseStore, summarize
+from .replay import ReplayCache, app_fingerprint, page_fingerprint, recording, replay
+from .scheduler import AgentRun, AgentScheduler, AgentTask, StepRecord
+from .screenshots import ScreenshotRecorder, ScreenshotSettings
+
 if TYPE_CHECKING:
-    from collections.abc import AsyncGenerator
+    from collections.abc import AsyncGenerator, Iterator
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -37,10 +47,28 @@ logger = logging.getLogger(__name__)
 BASE_URL = os.environ.get("E2E_BASE_URL", "https://d214my39l3yw2c.cloudfront.net")
 TEST_EMAIL = os.environ.get("E2E_TEST_EMAIL", "test@example.com")
 TEST_PASSWORD = os.environ.get("E2E_TEST_PASSWORD", "Test1234")
-DYNAMODB_TABLE = os.environ.get("E2E_DYNAMODB_TABLE", "sample-agentitest-todos")
-AWS_REGION = os.environ.get("E2E_AWS_REGION", "ap-northeast-1")
 LLM_TEMPERATURE = 0.2
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-pro")
+# 同時に実行するエージェントタスクの上限 (Gemini のレート制限に合わせる)
+AGENT_CONCURRENCY = int(os.getenv("AGENT_CONCURRENCY", "3"))
+AGENT_TASK_TIMEOUT = float(os.getenv("AGENT_TASK_TIMEOUT", "120"))
+# 成功した実行を記録し、次回からは LLM を使わずに再生する
+AGENT_REPLAY = os.getenv("AGENT_REPLAY", "True").lower() in ("true", "1", "t")
+# 同じ入力へのLLMの応答をキャッシュする (期限は秒、上限はMB)
+AGENT_LLM_CACHE = os.getenv("AGENT_LLM_CACHE", "True").lower() in ("true", "1", "t")
+AGENT_LLM_CACHE_TTL = float(os.getenv("AGENT_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+AGENT_LLM_CACHE_MAX_MB = int(os.getenv("AGENT_LLM_CACHE_MAX_MB", "200"))
+# ステップのスクリーンショット (モードは all / on-failure / off)
+SCREENSHOT_SETTINGS = ScreenshotSettings(
+    mode=os.getenv("AGENT_SCREENSHOTS", "all"),
+    every=int(os.getenv("AGENT_SCREENSHOT_EVERY", "1")),
+    format=os.getenv("AGENT_SCREENSHOT_FORMAT", "jpeg"),
+    quality=int(os.getenv("AGENT_SCREENSHOT_QUALITY", "70")),
+    max_width=int(os.getenv("AGENT_SCREENSHOT_MAX_WIDTH", "960")),
+)
 _SENSITIVE_VALUES = [v for v in (TEST_PASSWORD,) if v]
+# 記録と LLM 応答キャッシュには入力値をプレースホルダーで残し、使うときに置き換える
+_REPLAY_SECRETS = {"test_password": TEST_PASSWORD} if TEST_PASSWORD else {}
 
 
 def _mask(text: str) -> str:
@@ -55,36 +83,44 @@ def _mask(text: str) -> str:
 # ---------------------------------------------------------------------------
 
 
-@pytest.fixture(scope="session")
-def browser_version_info(browser_profile: BrowserProfile) -> dict[str, str]:
-    """Playwrightとブラウザのバージョンを取得する"""
+def _browser_version_info(
+    config: pytest.Config, pool: BrowserPool
+) -> dict[str, str]:
+    """Playwrightとブラウザのバージョンを取得する
+
+    バージョン確認のためだけにブラウザは起動しない。プールのブラウザが
+    起動していればCDPで取得した値を使い、Playwrightのバージョンごとに
+    pytestのキャッシュへ保存する。起動していなければキャッシュの値を使う。
+    """
     try:
-        with sync_playwright() as p:
-            playwright_version: str = version("playwright")
-            browser_type_name: str = (
-                browser_profile.channel if browser_profile.channel else "chromium"
-            )
-            browser = p[browser_type_name].launch()
-            browser_version: str = browser.version
-            browser.close()
-            return {
-                "playwright_version": playwright_version,
-                "browser_version": f"{browser_type_name} {browser_version}",
-            }
-    except Exception as e:
-        logger.warning(f"Could not determine Playwright/browser version: {e}")
-        return {
-            "playwright_version": "N/A",
-            "browser_version": "N/A",
-        }
+        playwright_version: str = version("playwright")
+    except PackageNotFoundError:
+        return {"playwright_version": "N/A", "browser_version": "N/A"}
+    cache = getattr(config, "cache", None)
+    key = f"agentitest/browser_version/{playwright_version}"
+    browser_version: str | None = None
+    if pool.browser_version:
+        browser_version = f"chromium {pool.browser_version.rsplit('/', 1)[-1]}"
+        if cache is not None:
+            cache.set(key, browser_version)
+    elif cache is not None:
+        browser_version = cache.get(key, None)
+    return {
+        "playwright_version": playwright_version,
+        "browser_version": browser_version or "N/A",
+    }
 
 
 @pytest.fixture(scope="session", autouse=True)
 def allure_environment(
     request: pytest.FixtureRequest,
-    browser_version_info: dict[str, str],
-) -> None:
-    """Allureレポート用の環境情報を出力する"""
+    browser_pool: BrowserPool,
+) -> Iterator[None]:
+    """Allureレポート用の環境情報を出力する
+
+    ブラウザのバージョンはテストで起動したブラウザから取るため、セッション終了時に書き出す。
+    """
+    yield
     allure_dir: str | None = request.config.getoption("--alluredir")
     if not allure_dir:
         return
@@ -96,6 +132,7 @@ def allure_environment(
     except OSError:
         return
 
+    browser_version_info = _browser_version_info(request.config, browser_pool)
     env_props: dict[str, str] = {
         "OS": os.name,
         "Python": f"{sys.version_info.major}.{sys.version_info.minor}",
@@ -111,15 +148,36 @@ def allure_environment(
         f.writelines(f"{key}={value}\n" for key, value in env_props.items())
 
 
-@pytest.fixture
-async def llm() -> ChatGoogle:
-    """LLMを初期化する（Gemini）"""
-    model_name: str = os.getenv("GEMINI_MODEL", "gemini-2.5-pro")
-    return ChatGoogle(
-        model=model_name,
+def _make_llm(store: ResponseStore | None = None) -> CachingChatModel:
+    """LLMを初期化する（Gemini）
+
+    `store` を渡すと同じ入力への応答をキャッシュから返す。
+    """
+    llm = ChatGoogle(
+        model=GEMINI_MODEL,
         temperature=LLM_TEMPERATURE,
         api_key=os.getenv("GEMINI_API_KEY"),
     )
+    return CachingChatModel(llm, store)
+
+
+@pytest.fixture(scope="session")
+def llm_response_store(
+    request: pytest.FixtureRequest,
+) -> Iterator[ResponseStore | None]:
+    """LLMの応答キャッシュ (pytestのキャッシュディレクトリに保存し、終了時に整理する)"""
+    cache = getattr(request.config, "cache", None)
+    if not AGENT_LLM_CACHE or cache is None:
+        yield None
+        return
+    store = ResponseStore(
+        cache.mkdir("agentitest-llm"),
+        ttl=AGENT_LLM_CACHE_TTL,
+        max_bytes=AGENT_LLM_CACHE_MAX_MB * 1024 * 1024,
+        secrets=_REPLAY_SECRETS,
+    )
+    yield store
+    store.prune()
 
 
 @pytest.fixture(scope="session")
@@ -129,33 +187,153 @@ def browser_profile() -> BrowserProfile:
     return BrowserProfile(headless=headless_mode, keep_alive=True)
 
 
-@pytest.fixture
-async def browser_session(
+@pytest.fixture(scope="session")
+def auth_storage_state() -> dict[str, Any]:
+    """テストユーザーの認証状態 (ワーカーごとに1回だけログインする)"""
+    with sync_playwright() as p:
+        browser = p.chromium.launch()
+        try:
+            return fetch_storage_state(browser, BASE_URL, TEST_EMAIL, TEST_PASSWORD)
+        finally:
+            browser.close()
+
+
+@pytest.fixture(scope="session")
+def browser_pool(browser_profile: BrowserProfile) -> Iterator[BrowserPool]:
+    """ワーカー内のテストで共有するブラウザ (必要になった時点で起動し、終了時に閉じる)"""
+    with sync_playwright() as p:
+        executable: str = p.chromium.executable_path
+    pool = BrowserPool(
+        executable,
+        BASE_URL,
+        headless=bool(browser_profile.headless),
+        size=AGENT_CONCURRENCY,
+    )
+    try:
+        yield pool
+    finally:
+        pool.close()
+
+
+@pytest.fixture(scope="session")
+def replay_cache(request: pytest.FixtureRequest) -> ReplayCache | None:
+    """成功した実行の記録 (pytestのキャッシュディレクトリに保存する)
+
+    アプリのフィンガープリントを取得できなければ再生しない。
+    """
+    cache = getattr(request.config, "cache", None)
+    if not AGENT_REPLAY or cache is None:
+        return None
+    fingerprint = app_fingerprint(BASE_URL)
+    if fingerprint is None:
+        logger.warning("Could not fingerprint the app; agent replay is disabled")
+        return None
+    return ReplayCache(cache.mkdir("agentitest-replay"), fingerprint)
+
+
+@pytest.fixture(scope="session")
+def agent_tasks(request: pytest.FixtureRequest) -> dict[str, AgentTask]:
+    """このセッションで選択されたテストが宣言したタスク (nodeid → タスク)"""
+    tasks: dict[str, AgentTask] = {}
+    for item in request.session.items:
+        marker = item.get_closest_marker("agent_task")
+        if marker is not None:
+            tasks[item.nodeid] = marker.args[0]
+    return tasks
+
+
+@pytest.fixture(scope="session")
+def agent_storage_state(
+    request: pytest.FixtureRequest, agent_tasks: dict[str, AgentTask]
+) -> dict[str, Any] | None:
+    """サインイン済みで始めるタスクがあれば、その認証状態 (無ければログインしない)"""
+    if any(task.signed_in for task in agent_tasks.values()):
+        return request.getfixturevalue("auth_storage_state")
+    return None
+
+
+@pytest.fixture(scope="session")
+async def agent_scheduler(
+    agent_tasks: dict[str, AgentTask],
+    agent_storage_state: dict[str, Any] | None,
+    browser_pool: BrowserPool,
     browser_profile: BrowserProfile,
-) -> AsyncGenerator[BrowserSession, None]:
-    """ブラウザセッションのライフサイクルを管理する"""
-    session: BrowserSession = BrowserSession(browser_profile=browser_profile)
-    await session.start()
+    replay_cache: ReplayCache | None,
+    llm_response_store: ResponseStore | None,
+    todo_cleaner: TodoCleaner,
+    tmp_path_factory: pytest.TempPathFactory,
+) -> AsyncGenerator[AgentScheduler, None]:
+    """エージェントタスクを並行実行するスケジューラー
+
+    選択されたテストのタスクをセッション開始時にまとめて投入する。
+    xdist のワーカーは自分に割り当てられるテストを事前に知らないため、
+    各テストが結果を取りに来た時点で投入する。
+    """
+    screenshot_dir = tmp_path_factory.mktemp("agentitest-screenshots")
+
+    async def run(task: AgentTask, record: AgentRun) -> None:
+        await _run_agent_task(
+            task,
+            record,
+            browser_pool,
+            browser_profile,
+            agent_storage_state if task.signed_in else None,
+            replay_cache,
+            llm_response_store if task.cache_llm else None,
+            todo_cleaner,
+            screenshot_dir,
+        )
+
+    scheduler = AgentScheduler(run, AGENT_CONCURRENCY)
+    if not os.environ.get("PYTEST_XDIST_WORKER"):
+        for nodeid, task in agent_tasks.items():
+            scheduler.submit(nodeid, task)
     try:
-        yield session
+        yield scheduler
     finally:
-        await session.stop()
+        await scheduler.close()
 
 
-@pytest.fixture(autouse=True)
-def cleanup_test_data():
-    """テスト後にDynamoDBのTodoデータを削除する"""
-    yield
-    kwargs = {"region_name": AWS_REGION}
-    if os.environ.get("AWS_PROFILE"):
-        kwargs["profile_name"] = os.environ["AWS_PROFILE"]
-    session = boto3.Session(**kwargs)
-    dynamodb = session.resource("dynamodb")
-    table = dynamodb.Table(DYNAMODB_TABLE)
-    response = table.scan()
-    for item in response.get("Items", []):
-        if item["id"] != 0:
-            table.delete_item(Key={"id": item["id"]})
+@pytest.fixture
+async def agent_run(
+    request: pytest.FixtureRequest,
+    agent_scheduler: AgentScheduler,
+    replay_cache: ReplayCache | None,
+) -> AsyncGenerator[AgentRun, None]:
+    """このテストが宣言したタスクの完了を待ち、記録をAllureに書き出す
+
+    テストが成功したら、LLMが実行したアクション列を次回の再生用に保存する。
+    """
+    marker = request.node.get_closest_marker("agent_task")
+    if marker is None:
+        pytest.fail("agent_run requires an @agent_task(...) marker")
+    run = await agent_scheduler.result(request.node.nodeid, marker.args[0])
+    _replay_run(run)
+    request.node.user_properties.append(("agent_mode", run.mode))
+    request.node.user_properties.append(("llm_usage", summarize(run.llm_calls)))
+    if run.acquire is not None:
+        request.node.user_properties.append(("browser_acquire", run.acquire))
+    if run.error is not None:
+        _attach_final_frame(run)
+        raise run.error
+    yield run
+    rep_call = getattr(request.node, "rep_call", None)
+    if rep_call is not None and rep_call.failed:
+        _attach_final_frame(run)
+    if replay_cache is None or run.recording is None:
+        return
+    if rep_call is not None and rep_call.passed:
+        replay_cache.store(run.replay_key, run.recording)
+
+
+def _attach_final_frame(run: AgentRun) -> None:
+    """失敗したタスクの最後の画面を添付する (AGENT_SCREENSHOTS=on-failure)"""
+    if run.final_frame is not None:
+        allure.attach(
+            run.final_frame,
+            name="screenshot_on_failure",
+            attachment_type=SCREENSHOT_SETTINGS.attachment_type,
+        )
 
 
 # ---------------------------------------------------------------------------
@@ -163,20 +341,62 @@ def cleanup_test_data():
 # ---------------------------------------------------------------------------
 
 
+SIGN_IN_INSTRUCTION = (
+    f"click the 'Sign In' link in the navigation. "
+    f"On the login page, enter '{TEST_EMAIL}' in the Email field "
+    f"and '{TEST_PASSWORD}' in the Password field, "
+    f"then click the 'Sign In' button. Wait for the page to load."
+)
+"""サインイン手順の自然言語指示"""
+
+OPEN_TODO_INSTRUCTION = (
+    "You are already signed in. "
+    "Click the 'Todo' link in the navigation and wait for the page to load."
+)
+"""サインイン済みセッションでTodoページを開く自然言語指示"""
+
+
+def agent_task(
+    instruction: str,
+    *,
+    signed_in: bool = False,
+    serial_group: str | None = None,
+    timeout: float = AGENT_TASK_TIMEOUT,
+    cache_llm: bool = True,
+) -> pytest.MarkDecorator:
+    """テストがエージェントに実行させるタスクを宣言する
+
+    `signed_in` ならサインイン済みのブラウザで始める。共有データを書き換える
+    タスクには `serial_group` を指定し、同じグループ同士を重ねずに実行する
+    (各タスクの後にテストデータを削除する)。毎回異なる判断をさせたい
+    タスクは `cache_llm=False` でLLMの応答キャッシュを使わない。
+    """
+    return pytest.mark.agent_task(
+        AgentTask(instruction, signed_in, serial_group, timeout, cache_llm)
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    try:
+        SCREENSHOT_SETTINGS.validate()
+    except ValueError as e:
+        raise pytest.UsageError(str(e))
+    config.addinivalue_line(
+        "markers", "agent_task(task): エージェントに実行させるタスクの宣言"
+    )
+
+
 class BaseAgentTest:
     """AIエージェントテストの基底クラス"""
 
-    async def run_task(
+    def assert_result(
         self,
-        llm: ChatGoogle,
-        browser_session: BrowserSession,
-        task_instruction: str,
+        run: AgentRun,
         expected_substring: str,
         ignore_case: bool = True,
     ) -> str:
-        """エージェントにタスクを実行させ、結果を検証する"""
-        full_task: str = f"Go to {BASE_URL}, then {task_instruction}"
-        result_text: str = await _run_agent_task(full_task, llm, browser_session)
+        """エージェントの最終結果を検証する"""
+        result_text: str = run.final_text
         assert result_text is not None and result_text.strip() != "", (
             "Agent did not return a result."
         )
@@ -200,110 +420,318 @@ class BaseAgentTest:
 
         return result_text
 
-    def _sign_in_instruction(self) -> str:
-        """サインイン手順の自然言語指示を返す"""
-        return (
-            f"click the 'Sign In' link in the navigation. "
-            f"On the login page, enter '{TEST_EMAIL}' in the Email field "
-            f"and '{TEST_PASSWORD}' in the Password field, "
-            f"then click the 'Sign In' button. Wait for the page to load."
-        )
 
+def _record_step(
+    agent: Agent,
+    steps: list[StepRecord],
+    llm_calls: list[LLMCall],
+    screenshots: ScreenshotRecorder,
+) -> None:
+    """各ステップのアクティビティを記録するフック (Allureへはテスト側で書き出す)
 
-async def _record_step(agent: Agent) -> None:
-    """各ステップのアクティビティをAllureに記録するフック"""
+    `llm_calls` はこのステップ中のLLM呼び出し。スクリーンショットは
+    バックグラウンドで撮るため、次のステップを待たせない。
+    """
     history = agent.history
 
     last_action: dict[str, Any] = (
         history.model_actions()[-1] if history.model_actions() else {}
     )
-    action_name: str = next(iter(last_action)) if last_action else "No action"
-    action_params: dict[str, Any] = last_action.get(action_name, {})
+    step = StepRecord(_action_title(last_action))
+    steps.append(step)
+
+    thoughts = history.model_thoughts()
+    if thoughts:
+        step.attach(
+            _mask(str(thoughts[-1])),
+            name="Agent Thoughts",
+            attachment_type=allure.attachment_type.TEXT,
+        )
+
+    url: str | None = history.urls()[-1] if history.urls() else "N/A"
+    step.attach(url, name="URL", attachment_type=allure.attachment_type.TEXT)
+
+    last_history_item = history.history[-1] if history.history else None
+    if last_history_item and last_history_item.metadata:
+        duration: float = last_history_item.metadata.duration_seconds
+        step.attach(
+            f"{duration:.2f}s",
+            name="Step Duration",
+            attachment_type=allure.attachment_type.TEXT,
+        )
+
+    if llm_calls:
+        usage = summarize(llm_calls)
+        step.attach(
+            f"{usage['calls']} calls ({usage['cached']} cached), "
+            f"{usage['prompt_tokens']} prompt + {usage['completion_tokens']} "
+            f"completion tokens, {usage['latency']:.2f}s",
+            name="LLM Usage",
+            attachment_type=allure.attachment_type.TEXT,
+        )
+
+    # 失敗したステップと最後 (done) のステップの画面は間引かずに残す
+    results = last_history_item.result if last_history_item else []
+    screenshots.capture(step, keep=any(r.error or r.is_done for r in results))
+
+
+async def _record_replayed_step(
+    session: BrowserSession,
+    item: AgentHistory,
+    steps: list[StepRecord],
+    screenshots: ScreenshotRecorder,
+) -> None:
+    """再生したステップを記録する"""
+    actions = item.model_output.action if item.model_output else []
+    for action in actions:
+        action_dict = action.model_dump(exclude_unset=True)
+        step = StepRecord(f"Replay: {_action_title(action_dict)}")
+        steps.append(step)
+    if actions:
+        url = await session.get_current_page_url()
+        step.attach(url, name="URL", attachment_type=allure.attachment_type.TEXT)
+        screenshots.capture(step)
+
+
+def _action_title(action: dict[str, Any]) -> str:
+    """アクションのステップ名 (例: "Action: click(index=3)")"""
+    action_name: str = next(iter(action)) if action else "No action"
+    action_params: dict[str, Any] = action.get(action_name) or {}
     step_title: str = f"Action: {action_name}"
     param_str: str = ", ".join(f"{k}={v}" for k, v in action_params.items())
     if param_str:
         step_title += f"({param_str})"
+    return _mask(step_title)
 
-    with allure.step(_mask(step_title)):
-        thoughts = history.model_thoughts()
-        if thoughts:
-            allure.attach(
-                _mask(str(thoughts[-1])),
-                name="Agent Thoughts",
-                attachment_type=allure.attachment_type.TEXT,
-            )
-
-        url: str | None = history.urls()[-1] if history.urls() else "N/A"
-        allure.attach(url, name="URL", attachment_type=allure.attachment_type.TEXT)
 
-        last_history_item = history.history[-1] if history.history else None
-        if last_history_item and last_history_item.metadata:
-            duration: float = last_history_item.metadata.duration_seconds
-            allure.attach(
-                f"{duration:.2f}s",
-                name="Step Duration",
-                attachment_type=allure.attachment_type.TEXT,
-            )
+def _replay_run(run: AgentRun) -> None:
+    """バッファしたステップと結果を、現在のテストのAllureレポートに順番どおり書き出す
 
-        try:
-            screenshot_b64 = await agent.browser_session.take_screenshot()
-            if screenshot_b64:
-                if isinstance(screenshot_b64, bytes):
-                    screenshot_bytes: bytes | None = screenshot_b64
-                elif _is_valid_base64(screenshot_b64):
-                    screenshot_bytes = base64.b64decode(screenshot_b64)
-                else:
-                    logger.warning("Invalid base64 padding in screenshot data")
-                    screenshot_bytes = None
-
-                if screenshot_bytes:
-                    allure.attach(
-                        screenshot_bytes,
-                        name="Screenshot",
-                        attachment_type=allure.attachment_type.PNG,
+    ファイルに書き出してある添付 (スクリーンショット) はファイルから添付する。
+    """
+    for step in run.steps:
+        with allure.step(step.title):
+            for body, name, attachment_type in step.attachments:
+                if isinstance(body, Path):
+                    allure.attach.file(
+                        str(body), name=name, attachment_type=attachment_type
                     )
-        except Exception as e:
-            logger.warning(f"Failed to take or attach screenshot: {e}")
+                else:
+                    allure.attach(body, name=name, attachment_type=attachment_type)
+
+    if run.final_text:
+        allure.attach(
+            run.final_text,
+            name="Final Result",
+            attachment_type=allure.attachment_type.TEXT,
+        )
+
+    lines = [
+        f"mode: {run.mode}",
+        f"queued: {run.queued_seconds:.2f}s",
+        f"run: {run.run_seconds:.2f}s",
+    ]
+    if run.acquire is not None:
+        mode, seconds = run.acquire
+        lines.append(f"browser {mode}: {seconds:.2f}s")
+    allure.attach(
+        "\n".join(lines),
+        name="Scheduling",
+        attachment_type=allure.attachment_type.TEXT,
+    )
+    if run.llm_calls:
+        allure.attach(
+            json.dumps(summarize(run.llm_calls), indent=2),
+            name="LLM Usage",
+            attachment_type=allure.attachment_type.JSON,
+        )
 
 
 async def _run_agent_task(
-    full_task: str,
-    llm: ChatGoogle,
-    browser_session: BrowserSession,
-) -> str:
-    """エージェントを初期化してタスクを実行する"""
+    task: AgentTask,
+    run: AgentRun,
+    pool: BrowserPool,
+    profile: BrowserProfile,
+    storage_state: dict[str, Any] | None,
+    replay_cache: ReplayCache | None,
+    response_store: ResponseStore | None,
+    todo_cleaner: TodoCleaner,
+    screenshot_dir: Path,
+) -> None:
+    """プールのブラウザでエージェントを初期化してタスクを実行する
+
+    記録があれば再生し、ずれた時点からLLMに引き継ぐ。
+    """
+    full_task: str = f"Go to {BASE_URL}, then {task.instruction}"
     logger.info(f"Running task: {_mask(full_task)}")
 
+    if task.serial_group:
+        await asyncio.to_thread(todo_cleaner.wait)  # 前のタスクの削除を待つ
+    started = time.perf_counter()
+    try:
+        async with pool.lease(storage_state) as (cdp_url, launched):
+            session = BrowserSession(browser_profile=profile, cdp_url=cdp_url)
+            await session.start()
+            run.acquire = (
+                "launch" if launched else "reuse",
+                time.perf_counter() - started,
+            )
+            screenshots = ScreenshotRecorder(
+                session, SCREENSHOT_SETTINGS, screenshot_dir
+            )
+            try:
+                await _run_agent(
+                    full_task, run, session, screenshots, replay_cache, response_store
+                )
+            finally:
+                run.final_frame = await screenshots.final_frame()
+                await screenshots.drain()
+                await session.stop()
+    finally:
+        if task.serial_group:
+            # エージェントのブラウザ通信からは作成IDを取得できないため全件を削除する
+            todo_cleaner.purge()
+            await asyncio.to_thread(todo_cleaner.wait)
+
+
+async def _run_agent(
+    full_task: str,
+    run: AgentRun,
+    session: BrowserSession,
+    screenshots: ScreenshotRecorder,
+    replay_cache: ReplayCache | None,
+    response_store: ResponseStore | None,
+) -> None:
+    replayed: list[AgentHistory] = []
+    if replay_cache is not None:
+        run.replay_key = replay_cache.key(full_task, GEMINI_MODEL)
+        replayer: Agent = Agent(
+            task=full_task,
+            llm=_make_llm(),
+            browser_session=session,
+            sensitive_data=_REPLAY_SECRETS,
+        )
+        cached = replay_cache.load(run.replay_key, replayer)
+        if cached is not None:
+            history, final_page, final_text = cached
+
+            async def on_step(item: AgentHistory) -> None:
+                await _record_replayed_step(session, item, run.steps, screenshots)
+
+            diverged = await replay(replayer, history, final_page, on_step)
+            if diverged is None:
+                run.mode = "replay"
+                run.final_text = final_text
+                return
+            run.mode = "handover"
+            replayed = diverged
+            logger.info(f"Replay diverged after {len(replayed)} steps; handing over")
+
+    task = full_task
+    if replayed:
+        goals = [
+            item.model_output.current_state.next_goal
+            for item in replayed
+            if item.model_output
+        ]
+        task += (
+            "\nThe following steps have already been done in the browser: "
+            + "; ".join(g for g in goals if g)
+            + ". Continue from the current page."
+        )
+    llm = _make_llm(response_store)
+    run.llm_calls = llm.calls
     agent: Agent = Agent(
-        task=full_task,
+        task=task,
         llm=llm,
-        browser_session=browser_session,
+        browser_session=session,
+        directly_open_url=not replayed,
     )
 
-    result = await asyncio.wait_for(agent.run(on_step_end=_record_step), timeout=120)
-    final_text: str | None = result.final_result()
-
-    if final_text is not None:
-        allure.attach(
-            final_text,
-            name="Final Result",
-            attachment_type=allure.attachment_type.TEXT,
+    async def on_step_end(agent: Agent) -> None:
+        step_calls = [call for call in llm.calls if call.step is None]
+        for call in step_calls:
+            call.step = agent.state.n_steps - 1  # ステップ終了時に加算済み
+        _record_step(agent, run.steps, step_calls, screenshots)
+
+    result = await agent.run(on_step_end=on_step_end)
+    run.final_text = result.final_result() or ""
+    if run.replay_key is not None and result.is_done():
+        run.recording = recording(
+            AgentHistoryList(history=[*replayed, *result.history]),
+            await page_fingerprint(session),
+            run.final_text,
+            _REPLAY_SECRETS,
         )
 
-    return final_text if final_text else ""
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    """テスト結果をrequestノードに格納（成功した実行の記録用）"""
+    outcome = yield
+    rep = outcome.get_result()
+    setattr(item, f"rep_{rep.when}", rep)
+
+
+def pytest_terminal_summary(terminalreporter, config: pytest.Config) -> None:
+    """エージェントの実行方法・LLMの使用量・ブラウザの起動と再利用の時間を出力する
+
+    LLMの使用量はテストごとに `--alluredir` の llm-usage.json
+    (`AGENT_LLM_USAGE_FILE` で変更可) にも書き出す。
+    """
+    acquires: dict[str, list[float]] = defaultdict(list)
+    modes: dict[str, int] = defaultdict(int)
+    llm_usage: dict[str, dict[str, Any]] = {}
+    for reports in terminalreporter.stats.values():
+        for report in reports:
+            if getattr(report, "when", None) != "teardown":
+                continue
+            for name, value in report.user_properties:
+                if name == "browser_acquire":
+                    mode, seconds = value
+                    acquires[mode].append(seconds)
+                elif name == "agent_mode":
+                    modes[value] += 1
+                elif name == "llm_usage":
+                    llm_usage[report.nodeid] = value
+    if modes:
+        terminalreporter.section("Agent runs")
+        for mode in ("llm", "replay", "handover"):
+            if modes.get(mode):
+                terminalreporter.write_line(f"{mode}: {modes[mode]}")
+    if llm_usage:
+        _write_llm_usage(terminalreporter, config, llm_usage)
+    if not acquires:
+        return
+    terminalreporter.section("Browser pool")
+    for mode in ("launch", "reuse"):
+        times = acquires.get(mode)
+        if times:
+            terminalreporter.write_line(
+                f"{mode}: {len(times)} x avg {sum(times) / len(times):.2f}s "
+                f"(total {sum(times):.2f}s)"
+            )
 
 
-def _is_valid_base64(s: Any) -> bool:
-    """Base64エンコードされたデータかどうかを検証する"""
-    try:
-        if isinstance(s, bytes):
-            base64.b64decode(s, validate=True)
-            return True
-        if isinstance(s, str):
-            if len(s) % 4 != 0:
-                return False
-            base64.b64decode(s, validate=True)
-            return True
-        return False
-    except binascii.Error:
-        return False
+def _write_llm_usage(
+    terminalreporter, config: pytest.Config, llm_usage: dict[str, dict[str, Any]]
+) -> None:
+    totals = {
+        key: sum(usage[key] for usage in llm_usage.values())
+        for key in ("calls", "cached", "prompt_tokens", "completion_tokens", "latency")
+    }
+    terminalreporter.section("LLM usage")
+    terminalreporter.write_line(
+        f"{totals['calls']} calls ({totals['cached']} cached), "
+        f"{totals['prompt_tokens']} prompt + {totals['completion_tokens']} "
+        f"completion tokens, {totals['latency']:.2f}s"
+    )
+    allure_dir: str | None = config.getoption("--alluredir", None)
+    path = os.getenv("AGENT_LLM_USAGE_FILE") or (
+        os.path.join(allure_dir, "llm-usage.json") if allure_dir else None
+    )
+    if path is None:
+        return
+    with open(path, "w") as f:
+        json.dump({"total": totals, "tests": llm_usage}, f, indent=2)
+    terminalreporter.write_line(f"written to {path}")
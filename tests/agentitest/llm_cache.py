@@ -0,0 +1,227 @@
+"""
+LLM 応答キャッシュと使用量の記録
+
+エージェントに渡すチャットモデルを `CachingChatModel` で包み、同じ入力
+(モデル・メッセージ・出力形式) への応答をディスクから返す。キーは入力の
+SHA-256 で、ファイル名もキーそのもの (内容アドレス) にする。実行ごとに
+変わるタブ ID はキーを作る前に伏せる。パスワードなどの秘密の値は、キーにも
+保存する応答にも `<secret>名前</secret>` のプレースホルダーで残し、読み出す
+ときに元の値に戻す (キャッシュは CI のキャッシュにも保存されるため)。
+
+キャッシュの有無にかかわらず、呼び出しごとのトークン数と応答時間を記録する。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from browser_use.llm.base import BaseChatModel
+from browser_use.llm.messages import BaseMessage
+from browser_use.llm.views import ChatInvokeCompletion
+from pydantic import BaseModel
+
+# タブ ID (CDP のターゲット ID の末尾 4 文字) は実行ごとに変わる
+_TAB_ID = re.compile(r"(Tab |Current tab: )[0-9A-Fa-f]{4}\b")
+
+
+@dataclass
+class LLMCall:
+    """LLM 呼び出し 1 回分の使用量"""
+
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    latency: float  # 秒
+    cached: bool
+    step: int | None = None  # エージェントのステップ番号 (ステップ終了時に設定する)
+
+
+class ResponseStore:
+    """LLM の応答を内容アドレスで保存するディスクキャッシュ
+
+    `ttl` 秒より古い応答は使わない。`prune` で期限切れを消し、合計が
+    `max_bytes` を超えていれば最後に使われたのが古い順に消す。`secrets`
+    (名前 → 値) の値はディスクに書かない。
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        ttl: float,
+        max_bytes: int,
+        secrets: dict[str, str] | None = None,
+    ) -> None:
+        self._directory = directory
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+        # JSON 文字列の中の表記 → プレースホルダー (長い値から置き換える)
+        self._secrets = sorted(
+            (
+                (json.dumps(value)[1:-1], f"<secret>{name}</secret>")
+                for name, value in (secrets or {}).items()
+                if value
+            ),
+            key=lambda pair: len(pair[0]),
+            reverse=True,
+        )
+
+    def key(
+        self,
+        model: str,
+        messages: list[BaseMessage],
+        output_format: type[BaseModel] | None,
+    ) -> str:
+        payload = {
+            "model": model,
+            "messages": [m.model_dump(mode="json") for m in messages],
+            "output_format": (
+                output_format.model_json_schema() if output_format else None
+            ),
+        }
+        text = _TAB_ID.sub(r"\1####", json.dumps(payload, sort_keys=True))
+        return hashlib.sha256(self._mask(text).encode()).hexdigest()
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        path = self._path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self._ttl:
+                return None
+            data = json.loads(self._unmask(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            return None
+        os.utime(path, (time.time(), path.stat().st_mtime))  # 最終使用時刻
+        return data
+
+    def put(self, key: str, data: dict[str, Any]) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        text = self._mask(json.dumps(data, ensure_ascii=False))
+        tmp.write_text(text, encoding="utf-8")
+        tmp.replace(path)
+
+    def prune(self) -> None:
+        """期限切れの応答を消し、上限を超えた分を使われていない順に消す"""
+        now = time.time()
+        entries: list[tuple[float, int, Path]] = []
+        for path in self._directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self._ttl:
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((stat.st_atime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self._max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def _path(self, key: str) -> Path:
+        return self._directory / key[:2] / f"{key}.json"
+
+    def _mask(self, text: str) -> str:
+        for value, placeholder in self._secrets:
+            text = text.replace(value, placeholder)
+        return text
+
+    def _unmask(self, text: str) -> str:
+        for value, placeholder in self._secrets:
+            text = text.replace(placeholder, value)
+        return text
+
+
+class CachingChatModel:
+    """チャットモデルを包み、応答のキャッシュと使用量の記録を行う
+
+    `store` が None なら毎回モデルを呼ぶ (使用量は記録する)。
+    """
+
+    _verified_api_keys: bool = False
+
+    def __init__(self, llm: BaseChatModel, store: ResponseStore | None) -> None:
+        self._llm = llm
+        self._store = store
+        self.model: str = llm.model
+        self.calls: list[LLMCall] = []
+
+    @property
+    def provider(self) -> str:
+        return self._llm.provider
+
+    @property
+    def name(self) -> str:
+        return self._llm.name
+
+    @property
+    def model_name(self) -> str:
+        return self.model
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._llm, name)
+
+    async def ainvoke(
+        self,
+        messages: list[BaseMessage],
+        output_format: type[BaseModel] | None = None,
+        **kwargs: Any,
+    ) -> ChatInvokeCompletion:
+        key = None
+        if self._store is not None:
+            key = self._store.key(self.model, messages, output_format)
+            cached = self._store.get(key)
+            if cached is not None:
+                completion = cached["completion"]
+                if output_format is not None:
+                    completion = output_format.model_validate(completion)
+                self.calls.append(LLMCall(0, 0, 0, 0.0, cached=True))
+                return ChatInvokeCompletion(
+                    completion=completion,
+                    thinking=cached.get("thinking"),
+                    usage=None,
+                )
+
+        started = time.perf_counter()
+        result = await self._llm.ainvoke(messages, output_format, **kwargs)
+        latency = time.perf_counter() - started
+        usage = result.usage
+        self.calls.append(
+            LLMCall(
+                usage.prompt_tokens if usage else 0,
+                usage.completion_tokens if usage else 0,
+                usage.total_tokens if usage else 0,
+                latency,
+                cached=False,
+            )
+        )
+        if key is not None:
+            completion = result.completion
+            if isinstance(completion, BaseModel):
+                completion = completion.model_dump(mode="json", exclude_unset=True)
+            self._store.put(
+                key, {"completion": completion, "thinking": result.thinking}
+            )
+        return result
+
+
+def summarize(calls: list[LLMCall]) -> dict[str, Any]:
+    """呼び出しの合計 (Allure と JSON に書き出す形)"""
+    return {
+        "calls": len(calls),
+        "cached": sum(c.cached for c in calls),
+        "prompt_tokens": sum(c.prompt_tokens for c in calls),
+        "completion_tokens": sum(c.completion_tokens for c in calls),
+        "total_tokens": sum(c.total_tokens for c in calls),
+        "latency": round(sum(c.latency for c in calls), 3),
+        "per_call": [asdict(c) for c in calls],
+    }
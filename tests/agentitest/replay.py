@@ -0,0 +1,133 @@
+"""
+エージェント実行のリプレイキャッシュ
+
+成功した実行のアクション列 (`agent.history`) を、タスクの文面・モデル・
+アプリのフィンガープリントから作ったキーで保存しておき、次回以降は LLM に
+計画させずにそのまま再生する。再生したステップの要素が見つからない、または
+最後のページが記録時と違う (= アプリの振る舞いが変わった) ときだけ、
+その時点から LLM に引き継ぐ。
+
+最後の `done` (エージェントの判定) は再生しない。最後のページの URL と
+表示テキストが記録時と同じときに限り、記録時の判定を使う。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import urllib.request
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+from browser_use import Agent, BrowserSession
+from browser_use.agent.views import AgentHistory, AgentHistoryList
+
+FINGERPRINT_TIMEOUT = 10  # 秒
+REPLAY_DELAY = 1.0  # 秒 (ステップ間の待ち)
+
+
+def app_fingerprint(base_url: str) -> str | None:
+    """テスト対象アプリのフィンガープリント (取得できなければ None)
+
+    Vite のビルド成果物はファイル名にハッシュが付くため、index.html の
+    内容はフロントエンドを再デプロイするたびに変わる。
+    """
+    try:
+        with urllib.request.urlopen(base_url, timeout=FINGERPRINT_TIMEOUT) as res:
+            return hashlib.sha256(res.read()).hexdigest()
+    except OSError:
+        return None
+
+
+async def page_fingerprint(session: BrowserSession) -> str:
+    """現在のページの URL と表示テキストのハッシュ"""
+    url = await session.get_current_page_url()
+    page = await session.get_current_page()
+    text = await page.evaluate("() => document.body.innerText") if page else ""
+    return hashlib.sha256(f"{url}\n{text}".encode()).hexdigest()
+
+
+def is_done(item: AgentHistory) -> bool:
+    """エージェントの判定 (`done` アクション) のステップか"""
+    actions = item.model_output.action if item.model_output else []
+    return any(
+        "done" in action.model_dump(exclude_unset=True) for action in actions
+    )
+
+
+async def replay(
+    agent: Agent,
+    history: AgentHistoryList,
+    final_page: str,
+    on_step: Callable[[AgentHistory], Awaitable[None]],
+) -> list[AgentHistory] | None:
+    """記録を再生する
+
+    最後まで記録どおりなら None を返す。途中で要素が見つからない、または
+    最後のページが記録と違うときは、それまでに再生できたステップを返す。
+    """
+    items = [item for item in history.history if not is_done(item)]
+    for count, item in enumerate(items):
+        try:
+            await agent.rerun_history(
+                AgentHistoryList(history=[item]),
+                max_retries=1,
+                skip_failures=False,
+                delay_between_actions=REPLAY_DELAY,
+            )
+        except RuntimeError:
+            return items[:count]
+        await on_step(item)
+    if await page_fingerprint(agent.browser_session) != final_page:
+        return items
+    return None
+
+
+class ReplayCache:
+    """成功した実行の記録をキーごとに JSON で保存する
+
+    キーにアプリのフィンガープリントを含めるため、アプリを更新すると
+    すべてのタスクが LLM による実行からやり直しになる。
+    """
+
+    def __init__(self, directory: Path, fingerprint: str) -> None:
+        self._directory = directory
+        self._fingerprint = fingerprint
+
+    def key(self, task: str, model: str) -> str:
+        source = f"{model}\n{self._fingerprint}\n{task}"
+        return hashlib.sha256(source.encode()).hexdigest()
+
+    def load(
+        self, key: str, agent: Agent
+    ) -> tuple[AgentHistoryList, str, str] | None:
+        """記録を読み込む。値は (アクション履歴, 最後のページ, 最終結果)"""
+        path = self._path(key)
+        if not path.exists():
+            return None
+        data = json.loads(path.read_text(encoding="utf-8"))
+        history = AgentHistoryList.load_from_file(path, agent.AgentOutput)
+        return history, data["final_page"], data["final_text"]
+
+    def store(self, key: str, recording: dict[str, Any]) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(recording, ensure_ascii=False), encoding="utf-8")
+
+    def _path(self, key: str) -> Path:
+        return self._directory / f"{key}.json"
+
+
+def recording(
+    history: AgentHistoryList,
+    final_page: str,
+    final_text: str,
+    sensitive_data: dict[str, str],
+) -> dict[str, Any]:
+    """保存する記録 (入力したパスワードなどは <secret> のプレースホルダーにする)"""
+    return {
+        **history.model_dump(sensitive_data=sensitive_data),
+        "final_page": final_page,
+        "final_text": final_text,
+    }
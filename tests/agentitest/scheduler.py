@@ -0,0 +1,117 @@
+"""
+エージェントタスクのスケジューラー — 上限付きの asyncio 並行実行
+
+エージェントテストの所要時間の大半は LLM の応答待ちなので、テストが宣言した
+タスクをセッション開始時にまとめて投入し、`concurrency` 件ずつ並行に実行する。
+各テストは自分のタスクの完了を待って結果を検証するだけなので、pytest の
+実行順 (= Allure の出力順) は変わらない。Allure への記録はタスク実行中は
+バッファし、テストの中で順番どおりに書き出す。
+
+同じ `serial_group` のタスク (共有データを書き換えるものなど) は互いに
+重ならないように 1 件ずつ実行する。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass(frozen=True)
+class AgentTask:
+    """エージェントに実行させるタスクの宣言"""
+
+    instruction: str
+    signed_in: bool = False
+    serial_group: str | None = None
+    timeout: float = 120.0
+    cache_llm: bool = True
+
+
+@dataclass
+class StepRecord:
+    """Allure に書き出す1ステップ分の記録"""
+
+    title: str
+    attachments: list[tuple[Any, str, Any]] = field(default_factory=list)
+
+    def attach(self, body: Any, name: str, attachment_type: Any) -> None:
+        self.attachments.append((body, name, attachment_type))
+
+
+@dataclass
+class AgentRun:
+    """タスクの実行結果"""
+
+    task: AgentTask
+    steps: list[StepRecord] = field(default_factory=list)
+    final_text: str = ""
+    acquire: tuple[str, float] | None = None  # ("launch" | "reuse", 秒)
+    # "llm" | "replay" | "handover" (再生が途中でずれてLLMに引き継いだ)
+    mode: str = "llm"
+    replay_key: str | None = None
+    recording: dict[str, Any] | None = None  # 成功したら保存するアクション列
+    llm_calls: list[Any] = field(default_factory=list)  # LLMCall
+    final_frame: bytes | None = None  # 失敗時に添付する最後の画面
+    queued_seconds: float = 0.0
+    run_seconds: float = 0.0
+    error: BaseException | None = None
+
+
+class AgentScheduler:
+    """宣言済みのエージェントタスクを最大 `concurrency` 件まで並行実行する"""
+
+    def __init__(
+        self,
+        run: Callable[[AgentTask, AgentRun], Awaitable[None]],
+        concurrency: int,
+    ) -> None:
+        self._run = run
+        self._slots = asyncio.Semaphore(concurrency)
+        self._groups: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._tasks: dict[str, asyncio.Task[AgentRun]] = {}
+
+    def submit(self, key: str, task: AgentTask) -> None:
+        """タスクを投入する (投入順に空いたスロットで実行される)"""
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._execute(task))
+
+    async def result(self, key: str, task: AgentTask) -> AgentRun:
+        """タスクの完了を待って結果を返す (未投入ならここで投入する)"""
+        self.submit(key, task)
+        return await self._tasks.pop(key)
+
+    async def close(self) -> None:
+        """結果を取りに来なかったタスクを止める"""
+        for pending in self._tasks.values():
+            pending.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+    async def _execute(self, task: AgentTask) -> AgentRun:
+        run = AgentRun(task)
+        queued = time.perf_counter()
+        group = (
+            self._groups[task.serial_group]
+            if task.serial_group
+            else contextlib.nullcontext()
+        )
+        # グループ待ちの間はスロットを占有しない
+        async with group, self._slots:
+            started = time.perf_counter()
+            run.queued_seconds = started - queued
+            try:
+                await asyncio.wait_for(self._run(task, run), timeout=task.timeout)
+            except TimeoutError as e:
+                run.error = TimeoutError(f"Agent task timed out after {task.timeout}s")
+                run.error.__cause__ = e
+            except Exception as e:
+                run.error = e
+            finally:
+                run.run_seconds = time.perf_counter() - started
+        return run
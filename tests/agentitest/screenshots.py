@@ -0,0 +1,187 @@
+"""
+エージェントのステップのスクリーンショット — バックグラウンドで取得・間引き
+
+ステップの終わりに撮影をバックグラウンドのタスクとして始めるだけにし、
+エージェントは次のステップにすぐ進む。撮影はブラウザ側で縮小・JPEG
+エンコードし (CDP の Page.captureScreenshot)、デコードと比較はスレッドで
+行う。直前に添付した画像と画素がまったく同じものは添付しない (入力した
+文字やエラーメッセージなど、小さな違いも証跡として残す)。失敗したステップと
+最後のステップの画像は常に添付する。添付する画像はすぐにファイルに書き出し、
+メモリには比較用のハッシュだけを残す。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import contextlib
+import hashlib
+import io
+import logging
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import allure
+from browser_use import BrowserSession
+from PIL import Image
+
+from .scheduler import StepRecord
+
+logger = logging.getLogger(__name__)
+
+MODES = ("all", "on-failure", "off")
+_ATTACHMENT_TYPES = {
+    "jpeg": allure.attachment_type.JPG,
+    "png": allure.attachment_type.PNG,
+}
+
+
+@dataclass(frozen=True)
+class ScreenshotSettings:
+    """スクリーンショットの撮り方
+
+    `mode` は "all" (`every` ステップごと)、"on-failure" (失敗したタスクの
+    最後の画面だけ)、"off" のいずれか。
+    """
+
+    mode: str = "all"
+    every: int = 1
+    format: str = "jpeg"  # "jpeg" | "png"
+    quality: int = 70  # JPEG のみ
+    max_width: int = 960  # これより広い画面は縮小する
+
+    @property
+    def attachment_type(self) -> Any:
+        return _ATTACHMENT_TYPES[self.format]
+
+    def validate(self) -> None:
+        """設定値を検証する (不正なら ValueError)"""
+        if self.mode not in MODES:
+            raise ValueError(f"AGENT_SCREENSHOTS must be one of {', '.join(MODES)}")
+        if self.every < 1:
+            raise ValueError("AGENT_SCREENSHOT_EVERY must be 1 or more")
+        if self.format not in _ATTACHMENT_TYPES:
+            raise ValueError(
+                f"AGENT_SCREENSHOT_FORMAT must be one of {', '.join(_ATTACHMENT_TYPES)}"
+            )
+        if not 1 <= self.quality <= 100:
+            raise ValueError("AGENT_SCREENSHOT_QUALITY must be between 1 and 100")
+        if self.max_width < 1:
+            raise ValueError("AGENT_SCREENSHOT_MAX_WIDTH must be 1 or more")
+
+
+class ScreenshotRecorder:
+    """1 タスク分のスクリーンショットをバックグラウンドで撮影・添付する"""
+
+    def __init__(
+        self, session: BrowserSession, settings: ScreenshotSettings, directory: Path
+    ) -> None:
+        self._session = session
+        self._settings = settings
+        self._directory = directory  # 添付する画像の書き出し先
+        self._steps = 0
+        self._previous: asyncio.Task[str | None] | None = None
+        self._pending: list[asyncio.Task[Any]] = []
+        self.skipped = 0  # 直前と同じ画面として添付しなかった数
+
+    def capture(self, step: StepRecord, keep: bool = False) -> None:
+        """ステップの画面を撮影して `step` に添付する (完了を待たない)
+
+        `keep` (失敗したステップ・最後のステップ) なら間引かずに必ず添付する。
+        """
+        self._steps += 1
+        if self._settings.mode != "all":
+            return
+        if not keep and (self._steps - 1) % self._settings.every:
+            return
+        self._previous = asyncio.create_task(
+            self._attach(step, self._previous, keep)
+        )
+        self._pending.append(self._previous)
+
+    async def final_frame(self) -> bytes | None:
+        """現在の画面 (on-failure 用)"""
+        if self._settings.mode != "on-failure":
+            return None
+        try:
+            return base64.b64decode(await self._grab())
+        except Exception as e:
+            logger.warning(f"Failed to take screenshot: {e}")
+            return None
+
+    async def drain(self) -> None:
+        """撮影中のスクリーンショットの添付が終わるのを待つ"""
+        await asyncio.gather(*self._pending, return_exceptions=True)
+        self._pending.clear()
+
+    async def _attach(
+        self,
+        step: StepRecord,
+        previous: asyncio.Task[str | None] | None,
+        keep: bool,
+    ) -> str | None:
+        """撮影して添付し、最後に添付した画像の画素のハッシュを返す"""
+        try:
+            data = await self._grab()
+            image, digest = await asyncio.to_thread(_decode, data)
+        except Exception as e:
+            logger.warning(f"Failed to take or attach screenshot: {e}")
+            image = digest = None
+        # 比較と添付は撮影した順に行う
+        last: str | None = None
+        if previous is not None:
+            with contextlib.suppress(Exception):
+                last = await previous
+        if digest is None:
+            return last
+        if not keep and digest == last:
+            self.skipped += 1
+            return last
+        path = self._directory / f"{uuid.uuid4().hex}.{self._settings.format}"
+        try:
+            await asyncio.to_thread(path.write_bytes, image)
+        except OSError as e:
+            logger.warning(f"Failed to take or attach screenshot: {e}")
+            return last
+        step.attach(
+            path,
+            name="Screenshot",
+            attachment_type=self._settings.attachment_type,
+        )
+        return digest
+
+    async def _grab(self) -> str:
+        """ブラウザで縮小・エンコードした表示領域の画像 (base64)"""
+        cdp = await self._session.get_or_create_cdp_session()
+        metrics = await cdp.cdp_client.send.Page.getLayoutMetrics(
+            session_id=cdp.session_id
+        )
+        viewport = metrics["cssVisualViewport"]
+        width, height = viewport["clientWidth"], viewport["clientHeight"]
+        params: dict[str, Any] = {
+            "format": self._settings.format,
+            "optimizeForSpeed": True,
+            "clip": {
+                "x": viewport["pageX"],
+                "y": viewport["pageY"],
+                "width": width,
+                "height": height,
+                "scale": min(1.0, self._settings.max_width / width),
+            },
+        }
+        if self._settings.format == "jpeg":
+            params["quality"] = self._settings.quality
+        result = await cdp.cdp_client.send.Page.captureScreenshot(
+            params=params, session_id=cdp.session_id
+        )
+        return result["data"]
+
+
+def _decode(data: str) -> tuple[bytes, str]:
+    """画像と、その画素 (サイズ込み) のハッシュ"""
+    image = base64.b64decode(data)
+    with Image.open(io.BytesIO(image)) as im:
+        digest = hashlib.sha256(repr(im.size).encode() + im.tobytes()).hexdigest()
+        return image, digest
@@ -0,0 +1,150 @@
+"""
+Allure 結果の圧縮とサマリーレポート — E2E / AgentiTest 共通
+
+allure-pytest は添付ごとに UUID 名のファイルを書くため、同じスクリーンショットや
+テキストでも添付した回数だけファイルが増える。セッション終了時に添付を内容の
+SHA-256 の名前 (内容アドレス) に付け替えて重複を 1 つにまとめ、結果 JSON の
+参照を書き換える。添付は圧縮しない (Allure レポートでそのまま表示するため。
+アップロード時の圧縮は CI に任せる)。ファイルはストリームで読むため、
+メモリ使用量は結果の大きさによらない。
+
+あわせて、テストごとの結果だけをまとめた 1 ファイルの HTML サマリーを書き出す。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import html
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any
+
+_CHUNK_SIZE = 1024 * 1024
+_ATTACHMENT = re.compile(r"^.+?-attachment\.(?P<ext>.+)$")
+_CONTENT_ADDRESSED = re.compile(r"^[0-9a-f]{64}-attachment\.")
+
+
+def compact_results(results_dir: str | os.PathLike[str]) -> tuple[int, int]:
+    """添付を内容アドレスにまとめる
+
+    値は (削除した重複ファイル数, 減ったバイト数)。
+    """
+    directory = Path(results_dir)
+    renames: dict[str, str] = {}  # 元の名前 → 新しい名前
+    removed = saved = 0
+    for path in sorted(directory.glob("*-attachment.*")):
+        match = _ATTACHMENT.match(path.name)
+        if match is None or _CONTENT_ADDRESSED.match(path.name):
+            continue
+        target = directory / f"{_sha256(path)}-attachment.{match['ext']}"
+        if target.exists():
+            saved += path.stat().st_size
+            removed += 1
+            path.unlink()
+        else:
+            path.replace(target)
+        renames[path.name] = target.name
+    _relink(directory, renames)
+    return removed, saved
+
+
+def write_summary(path: str | os.PathLike[str], rows: list[dict[str, Any]]) -> None:
+    """テストごとの結果を 1 ファイルの HTML にまとめる
+
+    `rows` の各要素は nodeid・outcome・duration (秒)・message と、
+    任意の追加列 (extra: 列名 → 値) を持つ。
+    """
+    columns = sorted({key for row in rows for key in row.get("extra", {})})
+    counts: dict[str, int] = {}
+    for row in rows:
+        counts[row["outcome"]] = counts.get(row["outcome"], 0) + 1
+    total = sum(row["duration"] for row in rows)
+    head = "".join(f"<th>{html.escape(c)}</th>" for c in columns)
+    body = "".join(
+        f'<tr class="{row["outcome"]}"><td>{html.escape(row["nodeid"])}</td>'
+        f"<td>{row['outcome']}</td><td>{row['duration']:.2f}s</td>"
+        + "".join(
+            f"<td>{html.escape(str(row.get('extra', {}).get(c, '')))}</td>"
+            for c in columns
+        )
+        + f"<td><pre>{html.escape(row.get('message') or '')}</pre></td></tr>\n"
+        for row in rows
+    )
+    stats = ", ".join(f"{outcome}: {n}" for outcome, n in sorted(counts.items()))
+    Path(path).write_text(
+        f"""<!DOCTYPE html>
+<html lang="ja">
+<head>
+<meta charset="UTF-8">
+<title>テスト結果サマリー</title>
+<style>
+body {{ font-family: sans-serif; font-size: 13px; margin: 16px; }}
+table {{ border-collapse: collapse; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: left; }}
+td {{ vertical-align: top; }}
+pre {{ margin: 0; white-space: pre-wrap; max-width: 60em; }}
+.passed td:nth-child(2) {{ color: #15803d; }}
+.failed td:nth-child(2), .error td:nth-child(2) {{ color: #b91c1c; }}
+</style>
+</head>
+<body>
+<h1>テスト結果サマリー</h1>
+<p>{len(rows)} tests ({stats}) in {total:.2f}s</p>
+<table>
+<tr><th>test</th><th>outcome</th><th>duration</th>{head}<th>message</th></tr>
+{body}</table>
+</body>
+</html>
+""",
+        encoding="utf-8",
+    )
+
+
+# -- 内部処理 -----------------------------------------------------------------
+
+
+def _result_files(directory: Path) -> list[Path]:
+    return [
+        *directory.glob("*-result.json"),
+        *directory.glob("*-container.json"),
+    ]
+
+
+def _attachments(node: Any):
+    """結果 JSON に含まれる添付 (ステップ・前後処理の中も含む)"""
+    if isinstance(node, dict):
+        for attachment in node.get("attachments", []):
+            yield attachment
+        for key, value in node.items():
+            if key != "attachments":
+                yield from _attachments(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _attachments(value)
+
+
+def _relink(directory: Path, renames: dict[str, str]) -> None:
+    """結果 JSON の添付の参照を新しい名前に書き換える"""
+    if not renames:
+        return
+    for path in _result_files(directory):
+        data = json.loads(path.read_text(encoding="utf-8"))
+        changed = False
+        for attachment in _attachments(data):
+            renamed = renames.get(attachment.get("source", ""))
+            if renamed is None:
+                continue
+            attachment["source"] = renamed
+            changed = True
+        if changed:
+            path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
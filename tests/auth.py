@@ -0,0 +1,34 @@
+"""
+認証状態の取得 — E2E / AgentiTest 共通
+
+Cognito のアプリクライアントは SRP 認証しか許可していないため、ログイン画面から
+1 回だけサインインし、トークン (localStorage) を含む storage_state を使い回す。
+セッションスコープのフィクスチャから呼ぶので、ログインはワーカーごとに 1 回になる。
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from playwright.sync_api import Browser
+
+
+def fetch_storage_state(
+    browser: Browser,
+    base_url: str,
+    email: str,
+    password: str,
+    **context_args: Any,
+) -> dict[str, Any]:
+    """ログイン画面からサインインし、コンテキストの storage_state を返す"""
+    context = browser.new_context(**context_args)
+    try:
+        page = context.new_page()
+        page.goto(f"{base_url}/login")
+        page.get_by_placeholder("Email").fill(email)
+        page.get_by_placeholder("Password").fill(password)
+        page.get_by_role("button", name="Sign In").click()
+        page.wait_for_url("**/todo", timeout=10000)
+        return context.storage_state()
+    finally:
+        context.close()
@@ -0,0 +1,170 @@
+"""
+テストデータ削除サービス — E2E / AgentiTest 共通
+
+セッション全体で DynamoDB の接続を使い回し、テストが作成した Todo の ID を
+記録してスキャンせずにその ID だけを削除する。削除はバックグラウンドで
+batch_writer を並列に使って行い、次のテストの開始時に完了を待つ。
+
+pytest-xdist で並列実行する場合、各ワーカーは Todo のタイトルに自分の
+接頭辞 (名前空間) を付け、全件削除も自分の名前空間のデータだけを対象にする。
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any
+from urllib.parse import urlparse
+
+import boto3
+
+from backend.parallel_scan import parallel_scan
+
+logger = logging.getLogger(__name__)
+
+COUNTER_ID = 0  # ID採番カウンター (削除しない)
+BATCH_WRITE_SIZE = 25
+_CREATE_PATHS = ("/api/todos", "/api/todos:batch")
+
+
+def worker_namespace() -> str:
+    """このワーカーのTodoタイトル接頭辞を返す (並列実行でなければ空文字)"""
+    worker = os.environ.get("PYTEST_XDIST_WORKER")
+    return f"[{worker}] " if worker else ""
+
+
+class TodoCleaner:
+    """テストで作成されたTodoを削除する
+
+    `namespace` を指定すると、全件削除はタイトルがその接頭辞で始まるTodoに限る。
+    """
+
+    def __init__(
+        self, table_name: str, region: str, workers: int = 4, namespace: str = ""
+    ) -> None:
+        kwargs: dict[str, Any] = {"region_name": region}
+        if os.environ.get("AWS_PROFILE"):
+            kwargs["profile_name"] = os.environ["AWS_PROFILE"]
+        self._session = boto3.Session(**kwargs)
+        self._table_name = table_name
+        self._namespace = namespace
+        # クライアントはスレッドセーフなので共有し、リソースはスレッドごとに作る
+        self._client = self._session.client("dynamodb")
+        self._local = threading.local()
+        self._session_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="cleanup")
+        self._lock = threading.Lock()
+        self._ids: set[int] = set()
+        self._responses: list[Any] = []
+        self._pending: list[Future] = []
+
+    # -- 記録 -----------------------------------------------------------------
+
+    def track(self, *todo_ids: int) -> None:
+        """削除対象のIDを記録する"""
+        with self._lock:
+            self._ids.update(todo_ids)
+
+    def track_response(self, response: Any) -> None:
+        """Playwright の response イベント用。Todo作成APIのレスポンスを記録する
+
+        ボディの読み取りはイベントハンドラ内では行わず、flush 時にまとめて行う。
+        """
+        request = response.request
+        if request.method != "POST" or not response.ok:
+            return
+        if urlparse(response.url).path.endswith(_CREATE_PATHS):
+            with self._lock:
+                self._responses.append(response)
+
+    # -- 削除 -----------------------------------------------------------------
+
+    def flush(self) -> None:
+        """記録したIDの削除をバックグラウンドで開始する"""
+        self._collect_responses()
+        with self._lock:
+            ids = sorted(self._ids - {COUNTER_ID})
+            self._ids.clear()
+        for start in range(0, len(ids), BATCH_WRITE_SIZE):
+            self._submit(self._delete, ids[start : start + BATCH_WRITE_SIZE])
+
+    def purge(self) -> None:
+        """名前空間内の全Todo (カウンター以外) の削除をバックグラウンドで開始する
+
+        作成IDを記録できない場合や、前回の実行の残りを消す場合に使う。
+        """
+        with self._lock:
+            self._ids.clear()
+            self._responses.clear()
+        self._submit(self._purge)
+
+    def wait(self) -> None:
+        """実行中の削除が終わるまで待つ"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        wait(pending)
+        for future in pending:
+            future.result()
+
+    def close(self) -> None:
+        self.flush()
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown()
+
+    # -- 内部処理 -------------------------------------------------------------
+
+    def _submit(self, fn, *args) -> None:
+        future = self._executor.submit(fn, *args)
+        with self._lock:
+            self._pending.append(future)
+
+    def _collect_responses(self) -> None:
+        with self._lock:
+            responses, self._responses = self._responses, []
+        for response in responses:
+            try:
+                body = response.json()
+            except Exception as e:
+                logger.warning(f"Could not read created todo ids: {e}")
+                continue
+            if "results" in body:
+                self.track(
+                    *(r["id"] for r in body["results"] if r.get("status") == "created")
+                )
+            elif "id" in body:
+                self.track(body["id"])
+
+    def _table(self):
+        table = getattr(self._local, "table", None)
+        if table is None:
+            with self._session_lock:
+                table = self._session.resource("dynamodb").Table(self._table_name)
+            self._local.table = table
+        return table
+
+    def _delete(self, todo_ids: list[int]) -> None:
+        with self._table().batch_writer() as batch:
+            for todo_id in todo_ids:
+                batch.delete_item(Key={"id": todo_id})
+
+    def _purge(self) -> None:
+        pages = parallel_scan(
+            self._client.scan,
+            fields=("id", "title") if self._namespace else ("id",),
+            TableName=self._table_name,
+        )
+        with self._table().batch_writer() as batch:
+            for page in pages:
+                for item in page:
+                    todo_id = int(item["id"]["N"])
+                    if todo_id != COUNTER_ID and self._in_namespace(item):
+                        batch.delete_item(Key={"id": todo_id})
+
+    def _in_namespace(self, item: dict[str, Any]) -> bool:
+        if not self._namespace:
+            return True
+        return item.get("title", {}).get("S", "").startswith(self._namespace)
@@ -0,0 +1,87 @@
+"""
+E2E / AgentiTest 共通設定 — テストデータの後片付け、ワーカーの名前空間、
+Allure 結果の圧縮とサマリーレポート
+"""
+
+from __future__ import annotations
+
+import os
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+
+from .artifacts import compact_results, write_summary
+from .cleanup import TodoCleaner, worker_namespace
+
+DYNAMODB_TABLE = os.environ.get("E2E_DYNAMODB_TABLE", "sample-agentitest-todos")
+AWS_REGION = os.environ.get("E2E_AWS_REGION", "ap-northeast-1")
+COMPACT_RESULTS = os.getenv("E2E_COMPACT_RESULTS", "True").lower() in ("true", "1", "t")
+_MESSAGE_LIMIT = 2000  # サマリーに載せる失敗メッセージの最大文字数
+
+
+@pytest.fixture(scope="session")
+def test_namespace() -> str:
+    """このワーカーが作成するTodoのタイトル接頭辞 (直列実行時は空文字)"""
+    return worker_namespace()
+
+
+@pytest.fixture(scope="session")
+def todo_cleaner(test_namespace: str) -> Iterator[TodoCleaner]:
+    """セッション共通のテストデータ削除サービス
+
+    開始時に前回の実行の残りを削除し、終了時に未完了の削除を待つ。
+    並列実行時は自分のワーカーの名前空間だけを削除する。
+    """
+    cleaner = TodoCleaner(DYNAMODB_TABLE, AWS_REGION, namespace=test_namespace)
+    cleaner.purge()
+    yield cleaner
+    cleaner.close()
+
+
+def pytest_terminal_summary(terminalreporter, config: pytest.Config) -> None:
+    """Allure の結果の添付をまとめ、テストごとのサマリーを書き出す
+
+    xdist の各ワーカーの結果も揃ったあと (コントローラー) で1回だけ行う。
+    """
+    if os.environ.get("PYTEST_XDIST_WORKER"):
+        return
+    allure_dir: str | None = config.getoption("--alluredir", None)
+    summary_path = os.getenv("E2E_SUMMARY_REPORT") or (
+        os.path.join(allure_dir, "summary.html") if allure_dir else None
+    )
+    if summary_path is not None:
+        write_summary(summary_path, _summary_rows(terminalreporter))
+        terminalreporter.write_line(f"Summary report: {summary_path}")
+    if allure_dir and COMPACT_RESULTS and os.path.isdir(allure_dir):
+        removed, saved = compact_results(allure_dir)
+        terminalreporter.write_line(
+            f"Allure results: {removed} duplicate attachments removed, "
+            f"{saved / 1024:.0f} KiB saved"
+        )
+
+
+def _summary_rows(terminalreporter) -> list[dict[str, Any]]:
+    """テストごとの結果 (各フェーズのレポートをまとめる)"""
+    rows: dict[str, dict[str, Any]] = {}
+    for reports in terminalreporter.stats.values():
+        for report in reports:
+            if getattr(report, "when", None) is None:
+                continue
+            row = rows.setdefault(
+                report.nodeid,
+                {"nodeid": report.nodeid, "outcome": "passed", "duration": 0.0},
+            )
+            row["duration"] += report.duration
+            if report.failed:
+                row["outcome"] = "failed" if report.when == "call" else "error"
+                row["message"] = report.longreprtext[-_MESSAGE_LIMIT:]
+            elif report.skipped and row["outcome"] == "passed":
+                row["outcome"] = "skipped"
+            if report.when == "teardown":
+                row["extra"] = {
+                    name: value
+                    for name, value in report.user_properties
+                    if isinstance(value, (str, int, float))
+                }
+    return sorted(rows.values(), key=lambda row: row["nodeid"])
@@ -8,48 +8,116 @@ Page Object ModelでUI詳細をテストロジックから分離する。
 from __future__ import annotations
 
 import os
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
+from urllib.parse import urlparse
 
 import allure
-import boto3
 import pytest
-from playwright.sync_api import Page
+from playwright.sync_api import Browser, Page, Response
+
+from ..auth import fetch_storage_state
+from ..cleanup import TodoCleaner
+from .stubs import FakeCognito, FakeTodoApi
 
 BASE_URL = os.environ.get("E2E_BASE_URL", "https://d214my39l3yw2c.cloudfront.net")
 TEST_EMAIL = os.environ.get("E2E_TEST_EMAIL", "test@example.com")
 TEST_PASSWORD = os.environ.get("E2E_TEST_PASSWORD", "Test1234")
-DYNAMODB_TABLE = os.environ.get("E2E_DYNAMODB_TABLE", "sample-agentitest-todos")
-AWS_REGION = os.environ.get("E2E_AWS_REGION", "ap-northeast-1")
+
+# スタブモード: /api/todos や Cognito をプロセス内のフェイクに置き換える
+STUB_API = os.getenv("E2E_STUB_API", "False").lower() in ("true", "1", "t")
+STUB_AUTH = os.getenv("E2E_STUB_AUTH", "False").lower() in ("true", "1", "t")
+COGNITO_CLIENT_ID = os.environ.get("E2E_COGNITO_CLIENT_ID", "stub-client")
 
 
 # ---------------------------------------------------------------------------
 # Page Objects
 # ---------------------------------------------------------------------------
 
+WAIT_TIMEOUT = 10000  # ms
 
-class NavBar:
-    """全ページ共通のトップナビゲーションバー"""
 
-    def __init__(self, page: Page) -> None:
+def _at_path(*paths: str) -> Callable[[str], bool]:
+    """URLのパスがいずれかの `paths` と一致するかを判定する (wait_for_url用)"""
+    targets = {path.rstrip("/") for path in paths}
+    return lambda url: urlparse(url).path.rstrip("/") in targets
+
+
+def _is_todo_list(response: Response) -> bool:
+    """Todo一覧APIのレスポンスかどうか"""
+    return response.request.method == "GET" and urlparse(response.url).path.endswith(
+        "/api/todos"
+    )
+
+
+class WaitTimer:
+    """Page Objectが待機に使った時間を操作ごとに集計する"""
+
+    def __init__(self) -> None:
+        self.seconds: dict[str, float] = defaultdict(float)
+
+    @property
+    def total(self) -> float:
+        return sum(self.seconds.values())
+
+    @contextmanager
+    def measure(self, action: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[action] += time.perf_counter() - start
+
+
+class _PageObject:
+    """Page Objectの基底クラス
+
+    固定のスリープや networkidle は使わず、操作ごとに必要なシグナル
+    (URLの変化・特定のAPIレスポンス・要素の状態) だけを待つ。
+    """
+
+    def __init__(self, page: Page, waits: WaitTimer | None = None) -> None:
         self._page = page
+        self._waits = waits or WaitTimer()
+
+    def _wait(self, action: str) -> AbstractContextManager[None]:
+        return self._waits.measure(f"{type(self).__name__}.{action}")
+
+
+class NavBar(_PageObject):
+    """全ページ共通のトップナビゲーションバー"""
+
+    def __init__(self, page: Page, waits: WaitTimer | None = None) -> None:
+        super().__init__(page, waits)
         self._home_link = page.get_by_role("link", name="Home")
         self._about_link = page.get_by_role("link", name="About", exact=True)
         self._todo_link = page.get_by_role("link", name="Todo")
 
     def navigate_to_home(self) -> None:
         self._home_link.click()
-        self._page.wait_for_load_state("networkidle")
+        with self._wait("navigate_to_home"):
+            self._page.wait_for_url(_at_path("/"), timeout=WAIT_TIMEOUT)
 
     def navigate_to_about(self) -> None:
         self._about_link.click()
-        self._page.wait_for_load_state("networkidle")
+        with self._wait("navigate_to_about"):
+            self._page.wait_for_url(_at_path("/about"), timeout=WAIT_TIMEOUT)
 
     def navigate_to_todo(self) -> None:
+        """Todoページ (未認証ならログインページ) に遷移するまで待つ"""
         self._todo_link.click()
-        self._page.wait_for_load_state("networkidle")
+        with self._wait("navigate_to_todo"):
+            self._page.wait_for_url(_at_path("/todo", "/login"), timeout=WAIT_TIMEOUT)
 
     def sign_out(self) -> None:
+        """サインアウトし、ナビがサインイン前の表示に戻るまで待つ"""
         self._page.get_by_role("button", name="Sign Out").click()
-        self._page.wait_for_timeout(500)
+        with self._wait("sign_out"):
+            self._page.get_by_role("link", name="Sign In").wait_for(
+                timeout=WAIT_TIMEOUT
+            )
 
     @property
     def is_sign_in_link_visible(self) -> bool:
@@ -60,15 +128,13 @@ class NavBar:
         return self._page.get_by_role("button", name="Sign Out").is_visible()
 
 
-class HomePage:
+class HomePage(_PageObject):
     """ランディングページ (/)"""
 
-    def __init__(self, page: Page) -> None:
-        self._page = page
-
     def open(self) -> None:
-        self._page.goto(f"{BASE_URL}/")
-        self._page.wait_for_load_state("networkidle")
+        with self._wait("open"):
+            self._page.goto(f"{BASE_URL}/")
+            self._page.get_by_role("heading", level=1).wait_for(timeout=WAIT_TIMEOUT)
 
     @property
     def title(self) -> str:
@@ -80,37 +146,44 @@ class HomePage:
 
     def click_about_card(self) -> None:
         self._page.get_by_role("heading", name="About").click()
-        self._page.wait_for_load_state("networkidle")
+        with self._wait("click_about_card"):
+            self._page.wait_for_url(_at_path("/about"), timeout=WAIT_TIMEOUT)
 
 
-class AboutPage:
+class AboutPage(_PageObject):
     """Aboutページ (/about)"""
 
-    def __init__(self, page: Page) -> None:
-        self._page = page
-
     def open(self) -> None:
-        self._page.goto(f"{BASE_URL}/about")
-        self._page.wait_for_load_state("networkidle")
+        with self._wait("open"):
+            self._page.goto(f"{BASE_URL}/about")
+            self._page.get_by_role("heading", level=1).wait_for(timeout=WAIT_TIMEOUT)
 
     @property
     def title(self) -> str:
         return self._page.get_by_role("heading", level=1).inner_text()
 
 
-class LoginPage:
+class LoginPage(_PageObject):
     """ログイン・サインアップページ (/login)"""
 
-    def __init__(self, page: Page) -> None:
-        self._page = page
+    def __init__(self, page: Page, waits: WaitTimer | None = None) -> None:
+        super().__init__(page, waits)
+        self._heading = page.get_by_role("heading", name="Sign In")
 
     def open(self) -> None:
-        self._page.goto(f"{BASE_URL}/login")
-        self._page.wait_for_load_state("networkidle")
+        with self._wait("open"):
+            self._page.goto(f"{BASE_URL}/login")
+            self._heading.wait_for(timeout=WAIT_TIMEOUT)
+
+    def wait_until_visible(self) -> None:
+        """ログインページへのリダイレクトが完了するまで待つ"""
+        with self._wait("wait_until_visible"):
+            self._page.wait_for_url(_at_path("/login"), timeout=WAIT_TIMEOUT)
+            self._heading.wait_for(timeout=WAIT_TIMEOUT)
 
     @property
     def is_visible(self) -> bool:
-        return self._page.get_by_role("heading", name="Sign In").is_visible()
+        return self._heading.is_visible()
 
     def sign_in(self, email: str, password: str) -> None:
         self._page.get_by_placeholder("Email").fill(email)
@@ -118,36 +191,78 @@ class LoginPage:
         self._page.get_by_role("button", name="Sign In").click()
 
 
-class TodoPage:
-    """Todo管理ページ (/todo)"""
+class TodoPage(_PageObject):
+    """Todo管理ページ (/todo)
 
-    def __init__(self, page: Page) -> None:
-        self._page = page
+    タイトルには `namespace` (ワーカーの接頭辞) を付けて操作し、一覧の検証では
+    自分の名前空間のTodoだけを接頭辞を外して返す。並列実行中の他ワーカーの
+    Todoは見えないものとして扱う。
+    """
+
+    def __init__(
+        self, page: Page, namespace: str = "", waits: WaitTimer | None = None
+    ) -> None:
+        super().__init__(page, waits)
+        self._namespace = namespace
+        self._heading = page.get_by_role("heading", name="Todo List")
 
     def open(self) -> None:
-        self._page.goto(f"{BASE_URL}/todo")
-        self._page.wait_for_load_state("networkidle")
+        with self.expect_loaded():
+            self._page.goto(f"{BASE_URL}/todo")
+
+    @contextmanager
+    def expect_loaded(self) -> Iterator[None]:
+        """ブロック内の操作でTodoページが開き、一覧APIの応答が届くまで待つ
+
+        一覧が空でも 'No todos yet' は取得前から表示されるため、要素ではなく
+        レスポンスで判定する。
+        """
+        with self._wait("load"):
+            with self._page.expect_response(_is_todo_list, timeout=WAIT_TIMEOUT):
+                yield
+            self._heading.wait_for(timeout=WAIT_TIMEOUT)
 
     @property
     def is_visible(self) -> bool:
-        return self._page.get_by_role("heading", name="Todo List").is_visible()
+        return self._heading.is_visible()
 
     def add_todo(self, title: str) -> None:
         """Todoを入力して追加ボタンを押し、リストに表示されるまで待つ"""
+        title = self._namespace + title
         self._page.get_by_placeholder("Enter a new todo").fill(title)
         self._page.get_by_role("button", name="Add").click()
-        self._page.get_by_text(title).first.wait_for(timeout=10000)
+        with self._wait("add_todo"):
+            self._page.get_by_text(title).first.wait_for(timeout=WAIT_TIMEOUT)
 
     def delete_todo(self, title: str) -> None:
         """指定タイトルのTodoを削除し、消えるまで待つ"""
+        title = self._namespace + title
         row = self._page.locator("li", has_text=title).first
         row.get_by_role("button", name="Delete").click()
-        self._page.get_by_text(title).first.wait_for(state="hidden", timeout=10000)
+        with self._wait("delete_todo"):
+            self._page.get_by_text(title).first.wait_for(
+                state="hidden", timeout=WAIT_TIMEOUT
+            )
 
     @property
     def todo_titles(self) -> list[str]:
         items = self._page.locator("li span").all()
-        return [item.inner_text() for item in items]
+        prefix = len(self._namespace)
+        return [
+            text[prefix:]
+            for text in (item.inner_text() for item in items)
+            if text.startswith(self._namespace)
+        ]
+
+    @property
+    def is_empty(self) -> bool:
+        """自分の名前空間のTodoが無い
+
+        直列実行時は一覧全体が空で 'No todos yet' が表示されていることを確認する。
+        """
+        if self._namespace:
+            return not self.todo_titles
+        return "No todos yet" in self.empty_message
 
     @property
     def empty_message(self) -> str:
@@ -162,72 +277,123 @@ class TodoPage:
 # ---------------------------------------------------------------------------
 
 
+VIEWPORT = {"width": 1280, "height": 720}
+
+
 @pytest.fixture(scope="session")
-def browser_context_args():
-    """ブラウザコンテキストの設定"""
-    return {"viewport": {"width": 1280, "height": 720}}
+def fake_cognito() -> FakeCognito:
+    return FakeCognito(COGNITO_CLIENT_ID, TEST_EMAIL)
+
+
+@pytest.fixture(scope="session")
+def auth_state(request: pytest.FixtureRequest, browser: Browser) -> dict:
+    """テストユーザーの認証状態 (ワーカーごとに1回だけログインする)
+
+    Cognito をスタブする場合はログインせず、フェイクのトークンを使う。
+    """
+    if STUB_AUTH:
+        return request.getfixturevalue("fake_cognito").storage_state(BASE_URL)
+    return fetch_storage_state(
+        browser, BASE_URL, TEST_EMAIL, TEST_PASSWORD, viewport=VIEWPORT
+    )
 
 
 @pytest.fixture
-def nav(page: Page) -> NavBar:
-    return NavBar(page)
+def browser_context_args(request: pytest.FixtureRequest) -> dict:
+    """ブラウザコンテキストの設定
+
+    `signed_in` を使うテストのコンテキストには認証状態を注入する。
+    """
+    args = {"viewport": VIEWPORT}
+    if "signed_in" in request.fixturenames:
+        args["storage_state"] = request.getfixturevalue("auth_state")
+    return args
 
 
 @pytest.fixture
-def home(page: Page) -> HomePage:
-    return HomePage(page)
+def wait_timer(request: pytest.FixtureRequest) -> Iterator[WaitTimer]:
+    """テスト中のPage Objectの待機時間を集計し、Allureとサマリーに出力する"""
+    timer = WaitTimer()
+    yield timer
+    request.node.user_properties.append(("page_waits", dict(timer.seconds)))
+    if timer.seconds:
+        allure.attach(
+            "\n".join(f"{action}: {sec:.3f}s" for action, sec in timer.seconds.items())
+            + f"\ntotal: {timer.total:.3f}s",
+            name="Page Object Waits",
+            attachment_type=allure.attachment_type.TEXT,
+        )
 
 
 @pytest.fixture
-def about(page: Page) -> AboutPage:
-    return AboutPage(page)
+def nav(page: Page, wait_timer: WaitTimer) -> NavBar:
+    return NavBar(page, wait_timer)
 
 
 @pytest.fixture
-def login(page: Page) -> LoginPage:
-    return LoginPage(page)
+def home(page: Page, wait_timer: WaitTimer) -> HomePage:
+    return HomePage(page, wait_timer)
 
 
 @pytest.fixture
-def todo(page: Page) -> TodoPage:
-    return TodoPage(page)
+def about(page: Page, wait_timer: WaitTimer) -> AboutPage:
+    return AboutPage(page, wait_timer)
 
 
 @pytest.fixture
-def signed_in(page: Page) -> None:
-    """テストユーザーでサインインし、Todoページに遷移する"""
-    page.goto(f"{BASE_URL}/login")
-    page.wait_for_load_state("networkidle")
-    page.get_by_placeholder("Email").fill(TEST_EMAIL)
-    page.get_by_placeholder("Password").fill(TEST_PASSWORD)
-    page.get_by_role("button", name="Sign In").click()
-    page.wait_for_url("**/todo", timeout=10000)
-    page.wait_for_load_state("networkidle")
+def login(page: Page, wait_timer: WaitTimer) -> LoginPage:
+    return LoginPage(page, wait_timer)
+
+
+@pytest.fixture
+def todo(page: Page, test_namespace: str, wait_timer: WaitTimer) -> TodoPage:
+    return TodoPage(page, test_namespace, wait_timer)
+
+
+@pytest.fixture
+def signed_in(todo: TodoPage) -> None:
+    """サインイン済みの状態でTodoページを開く
+
+    認証状態は browser_context_args でコンテキストに注入済みなので、
+    ログインフォームは操作しない。
+    """
+    todo.open()
 
 
 @pytest.fixture(autouse=True)
-def cleanup_test_data():
-    """テスト後にDynamoDBのTodoデータを削除する"""
+def stub_network(request: pytest.FixtureRequest, page: Page) -> None:
+    """スタブモードのとき、ページの通信をフェイクに振り向ける"""
+    if STUB_API:
+        FakeTodoApi().install(page)
+    if STUB_AUTH:
+        request.getfixturevalue("fake_cognito").install(page)
+
+
+@pytest.fixture(autouse=True)
+def cleanup_test_data(request: pytest.FixtureRequest, page: Page):
+    """テスト中に作成されたTodoを記録し、テスト後にバックグラウンドで削除する
+
+    APIをスタブする場合はフェイクがテストごとに作り直されるので何もしない。
+    """
+    if STUB_API:
+        yield
+        return
+    todo_cleaner: TodoCleaner = request.getfixturevalue("todo_cleaner")
+    todo_cleaner.wait()  # 前のテストの削除が終わってから始める
+    page.on("response", todo_cleaner.track_response)
     yield
-    kwargs = {"region_name": AWS_REGION}
-    if os.environ.get("AWS_PROFILE"):
-        kwargs["profile_name"] = os.environ["AWS_PROFILE"]
-    session = boto3.Session(**kwargs)
-    dynamodb = session.resource("dynamodb")
-    table = dynamodb.Table(DYNAMODB_TABLE)
-    response = table.scan()
-    for item in response.get("Items", []):
-        if item["id"] != 0:  # カウンターは保持
-            table.delete_item(Key={"id": item["id"]})
+    todo_cleaner.flush()
 
 
 @pytest.fixture(autouse=True)
 def screenshot_on_failure(page: Page, request):
-    """テスト失敗時にAllureレポートにスクリーンショットを添付する"""
+    """テスト失敗時にAllureレポートにスクリーンショットを添付する (ファイル経由)"""
     yield
     if request.node.rep_call and request.node.rep_call.failed:
-        allure.attach(
-            page.screenshot(),
+        path = request.getfixturevalue("tmp_path") / "screenshot_on_failure.png"
+        page.screenshot(path=path)
+        allure.attach.file(
+            str(path),
             name="screenshot_on_failure",
             attachment_type=allure.attachment_type.PNG,
         )
@@ -239,3 +405,26 @@ def pytest_runtest_makereport(item, call):
     outcome = yield
     rep = outcome.get_result()
     setattr(item, f"rep_{rep.when}", rep)
+
+
+def pytest_terminal_summary(terminalreporter) -> None:
+    """Page Objectの待機時間の合計を操作ごとに出力する (xdist の各ワーカー分も含む)"""
+    totals: dict[str, float] = defaultdict(float)
+    tests = 0
+    for reports in terminalreporter.stats.values():
+        for report in reports:
+            if getattr(report, "when", None) != "teardown":
+                continue
+            for name, waits in report.user_properties:
+                if name == "page_waits":
+                    tests += 1
+                    for action, sec in waits.items():
+                        totals[action] += sec
+    if not tests:
+        return
+    terminalreporter.section("Page Object waits")
+    terminalreporter.write_line(
+        f"total {sum(totals.values()):.2f}s across {tests} tests"
+    )
+    for action, sec in sorted(totals.items(), key=lambda kv: kv[1], reverse=True):
+        terminalreporter.write_line(f"  {action}: {sec:.2f}s")
@@ -0,0 +1,383 @@
+"""
+ネットワークスタブ — フロントエンドだけで E2E を回すためのフェイク
+
+`page.route` で `/api/todos` と Cognito への通信を横取りし、プロセス内の
+フェイクから応答する。CloudFront / API Gateway / Lambda / DynamoDB を
+経由しないため、`vite preview` のローカルビルドに対してミリ秒単位で動く。
+
+FakeTodoApi は backend/main.py と同じ意味論 (連番ID・ID昇順のページング・
+バージョン付きの変更フィード・存在しないIDの削除は404) を持つ。
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import itertools
+import json
+import re
+import secrets
+import time
+import uuid
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+from playwright.sync_api import Page, Route
+
+API_PATTERN = re.compile(r"/api/todos(?:[:/?].*)?$")
+COGNITO_PATTERN = re.compile(r"^https://cognito-idp\.[a-z0-9-]+\.amazonaws\.com/")
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+BATCH_MAX_ITEMS = 1000
+TOKEN_LIFETIME_SECONDS = 24 * 60 * 60
+
+_CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST, DELETE, OPTIONS",
+    "Access-Control-Allow-Headers": "Authorization, Content-Type",
+}
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: int, detail: Any) -> None:
+        self.status = status
+        self.detail = detail
+
+
+def _encode_cursor(position: dict) -> str:
+    raw = json.dumps({k: int(v) for k, v in position.items()}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, fields: tuple[str, ...] = ("id",)) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        return {field: int(data[field]) for field in fields}
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise _HTTPError(400, "Invalid cursor")
+
+
+def _int_param(query: dict, name: str, default: int | None, lo: int, hi: int | None):
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        value = int(values[0])
+    except ValueError:
+        raise _HTTPError(422, f"{name} must be an integer")
+    if value < lo or (hi is not None and value > hi):
+        raise _HTTPError(422, f"{name} is out of range")
+    return value
+
+
+class FakeTodoApi:
+    """/api/todos のプロセス内フェイク (テストごとに作り直す)"""
+
+    def __init__(self) -> None:
+        self._rows: dict[int, dict] = {}
+        self._ids = itertools.count(1)
+        self._versions = itertools.count(1)
+
+    def install(self, page: Page) -> None:
+        page.route(API_PATTERN, self._handle)
+
+    # -- ルーティング ---------------------------------------------------------
+
+    def _handle(self, route: Route) -> None:
+        request = route.request
+        if request.method == "OPTIONS":
+            route.fulfill(status=204, headers=_CORS_HEADERS)
+            return
+        url = urlparse(request.url)
+        try:
+            status, body = self._dispatch(
+                request.method, url.path, parse_qs(url.query), request.post_data
+            )
+        except _HTTPError as e:
+            status, body = e.status, {"detail": e.detail}
+        route.fulfill(status=status, json=body, headers=_CORS_HEADERS)
+
+    def _dispatch(
+        self, method: str, path: str, query: dict, data: str | None
+    ) -> tuple[int, Any]:
+        tail = path[path.rindex("/api/todos") + len("/api/todos") :]
+        if tail == "" and method == "GET":
+            return 200, self._get_todos(query)
+        if tail == "" and method == "POST":
+            return 201, self._create(self._body(data).get("title"))
+        if tail == ":batch" and method == "POST":
+            return 200, self._create_batch(self._body(data).get("items"))
+        if tail == ":batch" and method == "DELETE":
+            return 200, self._delete_batch(self._body(data).get("ids"))
+        if tail.startswith("/") and method == "DELETE":
+            try:
+                todo_id = int(tail[1:])
+            except ValueError:
+                raise _HTTPError(422, "todo_id must be an integer")
+            return 200, self._delete(todo_id)
+        raise _HTTPError(405 if tail in ("", ":batch") else 404, "Not Found")
+
+    @staticmethod
+    def _body(data: str | None) -> dict:
+        try:
+            body = json.loads(data or "")
+        except ValueError:
+            raise _HTTPError(422, "Invalid JSON body")
+        if not isinstance(body, dict):
+            raise _HTTPError(422, "Request body must be an object")
+        return body
+
+    # -- エンドポイント -------------------------------------------------------
+
+    def _get_todos(self, query: dict) -> dict:
+        limit = _int_param(query, "limit", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        since = _int_param(query, "since", None, 0, None)
+        cursor = query.get("cursor", [None])[0]
+        if since is not None:
+            return self._changes(since, limit, cursor)
+        lower = _decode_cursor(cursor)["id"] if cursor else 0
+        live = sorted(
+            i for i, row in self._rows.items() if not row["deleted"] and i > lower
+        )
+        page, more = live[:limit], len(live) > limit
+        return {
+            "items": [self._list_item(self._rows[i]) for i in page],
+            "next_cursor": _encode_cursor({"id": page[-1]}) if more else None,
+            "version": max((row["version"] for row in self._rows.values()), default=0),
+        }
+
+    def _changes(self, since: int, limit: int, cursor: str | None) -> dict:
+        after = (since, float("inf"))
+        if cursor:
+            position = _decode_cursor(cursor, ("version", "id"))
+            after = (position["version"], position["id"])
+        feed = sorted(
+            (row["version"], row["id"])
+            for row in self._rows.values()
+            if (row["version"], row["id"]) > after
+        )
+        keys, more = feed[:limit], len(feed) > limit
+        changes = [self._change(self._rows[i]) for _, i in keys]
+        return {
+            "changes": changes,
+            "version": max([since] + [c["version"] for c in changes]),
+            "next_cursor": (
+                _encode_cursor({"version": keys[-1][0], "id": keys[-1][1]})
+                if more
+                else None
+            ),
+        }
+
+    def _create(self, title: Any) -> dict:
+        if not isinstance(title, str):
+            raise _HTTPError(422, "title must be a string")
+        row = {
+            "id": next(self._ids),
+            "title": title,
+            "version": next(self._versions),
+            "deleted": False,
+        }
+        self._rows[row["id"]] = row
+        return self._change(row)
+
+    def _delete(self, todo_id: int) -> dict:
+        row = self._rows.get(todo_id)
+        if row is None or row["deleted"]:
+            raise _HTTPError(404, "Todo not found")
+        row.update(deleted=True, version=next(self._versions))
+        return self._change(row)
+
+    def _create_batch(self, items: Any) -> dict:
+        if not isinstance(items, list) or len(items) > BATCH_MAX_ITEMS:
+            raise _HTTPError(422, "items must be a list")
+        titles = [
+            item.get("title") if isinstance(item, dict) else None for item in items
+        ]
+        if not all(isinstance(title, str) for title in titles):
+            raise _HTTPError(422, "title must be a string")
+        return {
+            "results": [
+                {**self._create(title), "status": "created"} for title in titles
+            ]
+        }
+
+    def _delete_batch(self, ids: Any) -> dict:
+        if not isinstance(ids, list) or len(ids) > BATCH_MAX_ITEMS:
+            raise _HTTPError(422, "ids must be a list")
+        results = []
+        for todo_id in dict.fromkeys(ids):
+            try:
+                results.append({**self._delete(int(todo_id)), "status": "deleted"})
+            except _HTTPError:
+                results.append({"id": todo_id, "status": "not_found"})
+        return {"results": results}
+
+    @staticmethod
+    def _list_item(row: dict) -> dict:
+        return {"id": row["id"], "title": row["title"], "version": row["version"]}
+
+    @staticmethod
+    def _change(row: dict) -> dict:
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "version": row["version"],
+            "deleted": row["deleted"],
+        }
+
+
+# ---------------------------------------------------------------------------
+# Cognito
+# ---------------------------------------------------------------------------
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _fake_jwt(claims: dict) -> str:
+    """署名なしのJWT (amazon-cognito-identity-js はペイロードしか読まない)"""
+    header = _b64url(json.dumps({"alg": "none", "kid": "stub"}).encode())
+    return f"{header}.{_b64url(json.dumps(claims).encode())}.{_b64url(b'stub')}"
+
+
+class FakeCognito:
+    """Cognito ユーザープールのスタブ
+
+    SRP のサーバー側検証は行わないため、登録済みのメールアドレスであれば
+    パスワードに関わらずサインインできる。`vite preview` のビルドには
+    `client_id` と同じ `VITE_COGNITO_CLIENT_ID` を渡しておく。
+    """
+
+    def __init__(self, client_id: str, email: str) -> None:
+        self.client_id = client_id
+        self.email = email
+        self._operations = {
+            "InitiateAuth": self._initiate_auth,
+            "RespondToAuthChallenge": self._respond_to_auth_challenge,
+            "SignUp": self._sign_up,
+            "ConfirmSignUp": self._confirm_sign_up,
+        }
+
+    def install(self, page: Page) -> None:
+        page.route(COGNITO_PATTERN, self._handle)
+
+    def tokens(self) -> dict[str, str]:
+        """テストユーザーの IdToken / AccessToken / RefreshToken を発行する"""
+        now = int(time.time())
+        common = {
+            "sub": str(uuid.uuid5(uuid.NAMESPACE_URL, self.email)),
+            "iat": now,
+            "auth_time": now,
+            "exp": now + TOKEN_LIFETIME_SECONDS,
+        }
+        return {
+            "IdToken": _fake_jwt(
+                {
+                    **common,
+                    "token_use": "id",
+                    "aud": self.client_id,
+                    "email": self.email,
+                    "cognito:username": self.email,
+                }
+            ),
+            "AccessToken": _fake_jwt(
+                {
+                    **common,
+                    "token_use": "access",
+                    "client_id": self.client_id,
+                    "username": self.email,
+                }
+            ),
+            "RefreshToken": secrets.token_urlsafe(32),
+        }
+
+    def storage_state(self, base_url: str) -> dict[str, Any]:
+        """サインイン済みの localStorage を持つ Playwright の storage_state"""
+        url = urlparse(base_url)
+        prefix = f"CognitoIdentityServiceProvider.{self.client_id}"
+        tokens = self.tokens()
+        local_storage = {
+            f"{prefix}.LastAuthUser": self.email,
+            f"{prefix}.{self.email}.idToken": tokens["IdToken"],
+            f"{prefix}.{self.email}.accessToken": tokens["AccessToken"],
+            f"{prefix}.{self.email}.refreshToken": tokens["RefreshToken"],
+            f"{prefix}.{self.email}.clockDrift": "0",
+        }
+        return {
+            "cookies": [],
+            "origins": [
+                {
+                    "origin": f"{url.scheme}://{url.netloc}",
+                    "localStorage": [
+                        {"name": name, "value": value}
+                        for name, value in local_storage.items()
+                    ],
+                }
+            ],
+        }
+
+    def _handle(self, route: Route) -> None:
+        request = route.request
+        if request.method == "OPTIONS":
+            route.fulfill(
+                status=204,
+                headers={
+                    **_CORS_HEADERS,
+                    "Access-Control-Allow-Headers": "*",
+                },
+            )
+            return
+        target = request.headers.get("x-amz-target", "").rsplit(".", 1)[-1]
+        body = json.loads(request.post_data or "{}")
+        operation = self._operations.get(target)
+        if operation is None:
+            status, payload = 400, {
+                "__type": "InvalidParameterException",
+                "message": f"{target} is not supported by the stub",
+            }
+        else:
+            status, payload = operation(body)
+        route.fulfill(
+            status=status,
+            body=json.dumps(payload),
+            content_type="application/x-amz-json-1.1",
+            headers={"Access-Control-Allow-Origin": "*"},
+        )
+
+    def _initiate_auth(self, body: dict) -> tuple[int, dict]:
+        username = body.get("AuthParameters", {}).get("USERNAME")
+        if username != self.email:
+            return 400, {
+                "__type": "UserNotFoundException",
+                "message": "User does not exist.",
+            }
+        return 200, {
+            "ChallengeName": "PASSWORD_VERIFIER",
+            "ChallengeParameters": {
+                "USER_ID_FOR_SRP": self.email,
+                "USERNAME": self.email,
+                # クライアントは B mod N ≠ 0 だけを確認する
+                "SRP_B": secrets.token_hex(384),
+                "SALT": secrets.token_hex(16),
+                "SECRET_BLOCK": base64.b64encode(secrets.token_bytes(64)).decode(),
+            },
+        }
+
+    def _respond_to_auth_challenge(self, body: dict) -> tuple[int, dict]:
+        return 200, {
+            "AuthenticationResult": {
+                **self.tokens(),
+                "ExpiresIn": TOKEN_LIFETIME_SECONDS,
+                "TokenType": "Bearer",
+            },
+            "ChallengeParameters": {},
+        }
+
+    def _sign_up(self, body: dict) -> tuple[int, dict]:
+        return 200, {"UserConfirmed": False, "UserSub": str(uuid.uuid4())}
+
+    def _confirm_sign_up(self, body: dict) -> tuple[int, dict]:
+        return 200, {}
@@ -15,7 +15,7 @@ def test_未認証でTodoページにアクセスするとログインに飛ぶ(
     """サインインしていないユーザーが/todoにアクセスするとリダイレクトされる"""
     # 実行
     page.goto(f"{BASE_URL}/todo")
-    page.wait_for_load_state("networkidle")
+    login.wait_until_visible()
 
     # 検証
     assert login.is_visible
@@ -32,12 +32,12 @@ def test_正しい認証情報でサインインするとTodoページが表示
     login.open()
 
     # 実行
-    login.sign_in("test@example.com", "Test1234")
-    page.wait_for_url("**/todo", timeout=10000)
-    page.wait_for_load_state("networkidle")
+    with todo.expect_loaded():
+        login.sign_in("test@example.com", "Test1234")
 
     # 検証
     assert todo.is_visible
+    assert "/todo" in page.url
 
 
 @allure.feature("認証")
@@ -51,7 +51,7 @@ def test_サインアウト後にTodoページへアクセスするとログイ
 
     # 実行 — /todoに再アクセス
     page.goto(f"{BASE_URL}/todo")
-    page.wait_for_load_state("networkidle")
+    login.wait_until_visible()
 
     # 検証
     assert login.is_visible
@@ -31,7 +31,7 @@ def test_Todoを追加して削除すると空メッセージが表示される(
     todo.delete_todo("一時的なタスク")
 
     # 検証
-    assert "No todos yet" in todo.empty_message
+    assert todo.is_empty
 
 
 @allure.feature("Todo")